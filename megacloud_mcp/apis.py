@@ -1,13 +1,269 @@
+import asyncio
+import json
+import math
+import random
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import aclosing
 from enum import Enum
-from typing import Any, Dict, List
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlencode
+import httpx
 from pydantic import BaseModel
 
-from megacloud_mcp.settings import BACKEND_URL
-from megacloud_mcp.client import async_client
+from megacloud_mcp.settings import (
+    BACKEND_URL,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT_IN_SECONDS,
+    LOG_BULK_PAGE_SIZE,
+    LOG_CURSOR_MAX_ENTRIES,
+    LOG_PAGE_SIZE,
+    MIDDLEWARE_INSTANCE_INDEX_TTL_IN_SECONDS,
+    MIDDLEWARE_INSTANCE_PAGE_SIZE,
+    MIDDLEWARE_TYPE_PAGE_SIZE,
+    MIDDLEWARE_TYPE_TTL_IN_SECONDS,
+    PAGE_FETCH_CONCURRENCY,
+    RETRY_BASE_DELAY_IN_SECONDS,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_MAX_DELAY_IN_SECONDS,
+    RETRY_STATUS_CODES,
+)
+from megacloud_mcp.client import get_async_client, get_token
 from megacloud_mcp.log import logger
+from megacloud_mcp.logtemplates import log_text
 from megacloud_mcp.utils import from_unix_mill_to_datetime
 
 
+class APIError(Exception):
+    def __init__(self, endpoint: str, status_code: int, text: str):
+        super().__init__(f"Error: {status_code} - {text}")
+        self.endpoint = endpoint
+        self.status_code = status_code
+        self.text = text
+
+
+class APIConnectionError(APIError):
+    def __init__(self, endpoint: str, error: Exception):
+        super().__init__(endpoint, 0, f"{type(error).__name__}: {error}")
+
+
+class CircuitOpenError(APIError):
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(endpoint, 503, f"endpoint {endpoint} is temporarily unavailable, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker. After `failure_threshold` consecutive failures the
+    circuit opens and calls fail fast for `reset_timeout` seconds, then a single probe
+    is let through (half-open) to decide whether to close it again.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_timeout: float = CIRCUIT_RESET_TIMEOUT_IN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def before_request(self, endpoint: str) -> bool:
+        """
+        Raise CircuitOpenError when the call must fail fast, return whether it is the half-open probe.
+        """
+        if self.opened_at is None:
+            return False
+        elapsed = time.monotonic() - self.opened_at
+        if elapsed < self.reset_timeout or self.probing:
+            API_STATS[endpoint]["rejected"] += 1
+            raise CircuitOpenError(endpoint, max(self.reset_timeout - elapsed, 0.0))
+        self.probing = True
+        return True
+
+    def end_probe(self):
+        # a probe that neither succeeded nor failed (cancelled, unexpected error) lets the next call probe
+        self.probing = False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self, endpoint: str):
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.probing:
+                API_STATS[endpoint]["trips"] += 1
+                logger.warning(f"Circuit opened for endpoint {endpoint} after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+API_STATS: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_CIRCUIT_BREAKERS: Dict[str, CircuitBreaker] = defaultdict(CircuitBreaker)
+_IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def get_api_stats() -> Dict[str, Dict[str, int]]:
+    return {endpoint: dict(stats) for endpoint, stats in API_STATS.items()}
+
+
+def _backoff_delay(attempt: int) -> float:
+    # full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+    return random.uniform(0, min(RETRY_MAX_DELAY_IN_SECONDS, RETRY_BASE_DELAY_IN_SECONDS * (2**attempt)))
+
+
+async def request(
+    method: str,
+    endpoint: str,
+    path: str,
+    json: Any = None,
+    expected_status: int = 200,
+    idempotent: Optional[bool] = None,
+    content: Optional[str] = None,
+) -> httpx.Response:
+    """
+    Send a request to the MegaCloud backend. `endpoint` names the API for circuit breaking
+    and stats, `path` is appended to BACKEND_URL. Idempotent requests (GET by default) are
+    retried with jittered exponential backoff on connection errors and retryable status codes.
+    Identical concurrent GETs share a single upstream round trip. `content` sends an already
+    serialized JSON body instead of `json`.
+    """
+    if idempotent is None:
+        idempotent = method.upper() in _IDEMPOTENT_METHODS
+    if method.upper() == "GET" and json is None and content is None:
+        return await _coalesced_get(endpoint, path, expected_status, idempotent)
+    return await _send(method, endpoint, path, json, expected_status, idempotent, content)
+
+
+_INFLIGHT_GETS: Dict[str, "asyncio.Task[httpx.Response]"] = {}
+
+
+def _consume_inflight_get(path: str, task: "asyncio.Task[httpx.Response]"):
+    if _INFLIGHT_GETS.get(path) is task:
+        del _INFLIGHT_GETS[path]
+    # mark the exception as retrieved in case every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+
+async def _coalesced_get(endpoint: str, path: str, expected_status: int, idempotent: bool) -> httpx.Response:
+    # The upstream call runs in its own task so that a cancelled waiter does not cancel it
+    # for the others. Waiters share the response and decode it themselves, so callers that
+    # mutate the decoded payload do not affect each other.
+    task = _INFLIGHT_GETS.get(path)
+    if task is None:
+        task = asyncio.ensure_future(_send("GET", endpoint, path, None, expected_status, idempotent))
+        _INFLIGHT_GETS[path] = task
+        task.add_done_callback(lambda t: _consume_inflight_get(path, t))
+    else:
+        API_STATS[endpoint]["coalesced"] += 1
+    return await asyncio.shield(task)
+
+
+async def _send(
+    method: str,
+    endpoint: str,
+    path: str,
+    json: Any,
+    expected_status: int,
+    idempotent: bool,
+    content: Optional[str] = None,
+) -> httpx.Response:
+    max_attempts = RETRY_MAX_ATTEMPTS if idempotent else 1
+    breaker = _CIRCUIT_BREAKERS[endpoint]
+    stats = API_STATS[endpoint]
+    url = BACKEND_URL + path
+
+    attempt = 0
+    while True:
+        probe = breaker.before_request(endpoint)
+        stats["requests"] += 1
+        try:
+            if content is not None:
+                response = await get_async_client().request(method, url, content=content, headers={"Content-Type": "application/json"})
+            else:
+                response = await get_async_client().request(method, url, json=json)
+        except httpx.TransportError as e:
+            error: APIError = APIConnectionError(endpoint, e)
+        except BaseException:
+            if probe:
+                breaker.end_probe()
+            raise
+        else:
+            if response.status_code == expected_status:
+                breaker.record_success()
+                return response
+            error = APIError(endpoint, response.status_code, response.text)
+            if response.status_code == 401:
+                invalidate_authorizations()
+            if response.status_code not in RETRY_STATUS_CODES:
+                # the backend answered, it is healthy but rejected the request
+                breaker.record_success()
+                stats["errors"] += 1
+                raise error
+
+        breaker.record_failure(endpoint)
+        attempt += 1
+        if attempt >= max_attempts or breaker.is_open:
+            stats["errors"] += 1
+            logger.error(f"Request {method} {path} failed after {attempt} attempts: {error}")
+            raise error
+        stats["retries"] += 1
+        delay = _backoff_delay(attempt)
+        logger.warning(f"Request {method} {path} failed: {error}, retry {attempt}/{max_attempts - 1} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+async def iter_pages(
+    fetch_page: Callable[[int], Awaitable[dict]],
+    page_size: int,
+    total_key: str = "total",
+    items_key: str = "list",
+    max_pages: Optional[int] = None,
+    first: Optional[dict] = None,
+) -> AsyncIterator[dict]:
+    """
+    Yield every page of a paginated listing, or the first `max_pages`. The total count is read
+    from the first page, or from `first` when the caller already fetched it, and the remaining
+    pages are fetched concurrently (bounded by PAGE_FETCH_CONCURRENCY) and yielded in arrival
+    order. Without a total, pages are read until a short one.
+    """
+    if first is None:
+        first = await fetch_page(1)
+    yield first
+
+    total = first.get(total_key)
+    if total is None:
+        page, data = 1, first
+        while len(data[items_key]) >= page_size and (max_pages is None or page < max_pages):
+            page += 1
+            data = await fetch_page(page)
+            yield data
+        return
+
+    page_count = math.ceil(total / page_size)
+    if max_pages is not None:
+        page_count = min(page_count, max_pages)
+    semaphore = asyncio.Semaphore(PAGE_FETCH_CONCURRENCY)
+
+    async def bounded_fetch_page(page: int) -> dict:
+        async with semaphore:
+            return await fetch_page(page)
+
+    tasks = [asyncio.ensure_future(bounded_fetch_page(page)) for page in range(2, page_count + 1)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 class Node(BaseModel):
     node_name: str
     middleware_type: int
@@ -33,15 +289,14 @@ def create_nodes_request(middleware_type: int, map: Dict[str, int]) -> dict:
 
 
 async def create_nodes(body: dict) -> List[Node]:
-    url = BACKEND_URL + "/v1/middleware/management/instance/nodes"
-    response = await async_client.post(url, json=body)
-    if response.status_code == 200:
-        json_data = response.json()
-        nodes = [Node(**node) for node in json_data]
-        return nodes
-    else:
+    try:
+        response = await request("POST", "create_nodes", "/v1/middleware/management/instance/nodes", json=body)
+    except APIError:
         logger.error(f"Failed to create nodes: {body}")
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+        raise
+    json_data = response.json()
+    nodes = [Node(**node) for node in json_data]
+    return nodes
 
 
 class MiddlewareNode(BaseModel):
@@ -94,13 +349,13 @@ def create_middleware_instance_request(
 
 
 async def create_middleware_instance(body: dict):
-    url = BACKEND_URL + "/v1/middleware/management/instance"
-    response = await async_client.post(url, json=body)
-    if response.status_code == 200:
-        return response.json()
-    else:
+    try:
+        response = await request("POST", "create_middleware_instance", "/v1/middleware/management/instance", json=body)
+    except APIError:
         logger.error(f"Failed to create middleware instance, body: {body}")
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+        raise
+    invalidate_middleware_instance_index()
+    return response.json()
 
 
 class Host(BaseModel):
@@ -115,14 +370,10 @@ class Host(BaseModel):
 
 
 async def list_available_hosts() -> List[Host]:
-    url = BACKEND_URL + "/v1/middleware/management/hosts/get-for-deploy"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        hosts = [Host(**host) for host in data]
-        return hosts
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("GET", "list_available_hosts", "/v1/middleware/management/hosts/get-for-deploy")
+    data = response.json()
+    hosts = [Host(**host) for host in data]
+    return hosts
 
 
 class MiddlewareType(BaseModel):
@@ -130,35 +381,64 @@ class MiddlewareType(BaseModel):
     middleware_type: int
 
 
+async def _list_middleware_type_page(page: int) -> dict:
+    path = f"/v1/middleware/management/services?page={page}&pageSize={MIDDLEWARE_TYPE_PAGE_SIZE}"
+    response = await request("GET", "list_available_middleware_type", path)
+    return response.json()
+
+
 async def list_available_middleware_type() -> List[MiddlewareType]:
-    url = BACKEND_URL + "/v1/middleware/management/services?pageSize=50"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        types = [MiddlewareType(**type) for type in data["list"]]
-        return types
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    types = []
+    async for data in iter_pages(_list_middleware_type_page, MIDDLEWARE_TYPE_PAGE_SIZE):
+        types.extend(MiddlewareType(**type) for type in data["list"])
+    return types
+
+
+class MiddlewareTypeRegistry:
+    """
+    Shared middleware type <-> name mapping. Loaded once and refreshed after `ttl` seconds;
+    the lock makes concurrent cold-start callers wait for a single load.
+    """
+
+    def __init__(self, ttl: float = MIDDLEWARE_TYPE_TTL_IN_SECONDS):
+        self.ttl = ttl
+        self.type2name: Dict[int, str] = {}
+        self.name2type: Dict[str, int] = {}
+        self.loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def expired(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+
+    async def load(self):
+        if not self.expired():
+            return
+        async with self._lock:
+            if not self.expired():
+                return
+            middleware_types = await list_available_middleware_type()
+            self.type2name = {middleware.middleware_type: middleware.name for middleware in middleware_types}
+            self.name2type = {middleware.name.lower(): middleware.middleware_type for middleware in middleware_types}
+            self.loaded_at = time.monotonic()
+
+    async def get_name(self, middleware_type: int) -> str:
+        await self.load()
+        return self.type2name.get(middleware_type, "Unknown")
+
+    async def get_type(self, middleware_name: str) -> int:
+        await self.load()
+        return self.name2type.get(middleware_name.lower(), -1)
 
 
-_MIDDLEWARE_TYPE2NAME: Dict[int, str] = {}
-_MIDDLEWARE_NAME2TYPE: Dict[str, int] = {}
+MIDDLEWARE_TYPES = MiddlewareTypeRegistry()
 
 
 async def get_middleware_name(middleware_type: int) -> str:
-    if len(_MIDDLEWARE_TYPE2NAME) == 0:
-        middleware_types = await list_available_middleware_type()
-        for middleware in middleware_types:
-            _MIDDLEWARE_TYPE2NAME[middleware.middleware_type] = middleware.name
-    return _MIDDLEWARE_TYPE2NAME.get(middleware_type, "Unknown")
+    return await MIDDLEWARE_TYPES.get_name(middleware_type)
 
 
 async def get_middleware_type(middleware_name: str) -> int:
-    if len(_MIDDLEWARE_NAME2TYPE) == 0:
-        middleware_types = await list_available_middleware_type()
-        for middleware in middleware_types:
-            _MIDDLEWARE_NAME2TYPE[middleware.name.lower()] = middleware.middleware_type
-    return _MIDDLEWARE_NAME2TYPE.get(middleware_name.lower(), -1)
+    return await MIDDLEWARE_TYPES.get_type(middleware_name)
 
 
 class MiddlewareInstance(BaseModel):
@@ -171,18 +451,57 @@ class MiddlewareInstance(BaseModel):
     status: dict
 
 
+async def _list_middleware_instance_page(page: int) -> dict:
+    path = f"/v1/middleware/management/instance?name=&hostName=&rows={MIDDLEWARE_INSTANCE_PAGE_SIZE}&page={page}&group=middleware"
+    response = await request("GET", "list_current_middleware_instances", path)
+    return response.json()
+
+
+def _parse_middleware_instances(data: dict, type2name: Dict[int, str]) -> List[MiddlewareInstance]:
+    return [MiddlewareInstance(**{**instance, "middleware_name": type2name.get(instance["middleware_type"], "Unknown")}) for instance in data["list"]]
+
+
+async def iter_current_middleware_instances() -> AsyncIterator[MiddlewareInstance]:
+    """
+    Yield all middleware instances as their pages arrive.
+    """
+    await MIDDLEWARE_TYPES.load()
+    type2name = MIDDLEWARE_TYPES.type2name
+    async for data in iter_pages(_list_middleware_instance_page, MIDDLEWARE_INSTANCE_PAGE_SIZE):
+        for instance in _parse_middleware_instances(data, type2name):
+            yield instance
+
+
 async def list_current_middleware_instances() -> List[MiddlewareInstance]:
-    url = BACKEND_URL + "/v1/middleware/management/instance?name=&hostName=&rows=100&page=1&group=middleware"
-    response = await async_client.get(url)
-    result = []
-    if response.status_code == 200:
-        data = response.json()
-        for instance in data["list"]:
-            instance["middleware_name"] = await get_middleware_name(instance["middleware_type"])
-            result.append(MiddlewareInstance(**instance))
-        return result
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    generation = _MIDDLEWARE_INSTANCE_INDEX_GENERATION
+    result = [instance async for instance in iter_current_middleware_instances()]
+    _update_middleware_instance_index(result, generation)
+    return result
+
+
+# name -> instance index, refreshed by every full listing
+_MIDDLEWARE_INSTANCE_INDEX: Dict[str, MiddlewareInstance] = {}
+_MIDDLEWARE_INSTANCE_INDEX_LOADED_AT: Optional[float] = None
+# bumped on invalidation so that a listing started before a change does not mark the index fresh
+_MIDDLEWARE_INSTANCE_INDEX_GENERATION = 0
+
+
+def _update_middleware_instance_index(instances: List[MiddlewareInstance], generation: int):
+    global _MIDDLEWARE_INSTANCE_INDEX, _MIDDLEWARE_INSTANCE_INDEX_LOADED_AT
+    _MIDDLEWARE_INSTANCE_INDEX = {instance.name: instance for instance in instances}
+    if generation == _MIDDLEWARE_INSTANCE_INDEX_GENERATION:
+        _MIDDLEWARE_INSTANCE_INDEX_LOADED_AT = time.monotonic()
+
+
+def invalidate_middleware_instance_index():
+    global _MIDDLEWARE_INSTANCE_INDEX_LOADED_AT, _MIDDLEWARE_INSTANCE_INDEX_GENERATION
+    _MIDDLEWARE_INSTANCE_INDEX_LOADED_AT = None
+    _MIDDLEWARE_INSTANCE_INDEX_GENERATION += 1
+
+
+def _middleware_instance_index_expired() -> bool:
+    loaded_at = _MIDDLEWARE_INSTANCE_INDEX_LOADED_AT
+    return loaded_at is None or time.monotonic() - loaded_at > MIDDLEWARE_INSTANCE_INDEX_TTL_IN_SECONDS
 
 
 class MiddlewareOperations(Enum):
@@ -192,53 +511,40 @@ class MiddlewareOperations(Enum):
 
 
 async def put_middleware_instance(id: int, operation: int):
-    url = BACKEND_URL + f"/v1/middleware/management/instance/{id}/operations/{operation}"
-    response = await async_client.put(url)
-    if response.status_code == 200:
-        return "OK"
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    await request("PUT", "put_middleware_instance", f"/v1/middleware/management/instance/{id}/operations/{operation}")
+    invalidate_middleware_instance_index()
+    return "OK"
 
 
 async def del_middleware_instance(id: int):
-    url = BACKEND_URL + f"/v1/middleware/management/instance/{id}"
-    response = await async_client.delete(url)
-    if response.status_code == 200:
-        return "OK"
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    await request("DELETE", "del_middleware_instance", f"/v1/middleware/management/instance/{id}")
+    invalidate_middleware_instance_index()
+    return "OK"
 
 
 async def get_middleware_instance_info(id: int) -> dict:
-    url = BACKEND_URL + f"/v1/middleware/management/instance/{id}"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("GET", "get_middleware_instance_info", f"/v1/middleware/management/instance/{id}")
+    return response.json()
 
 
 async def get_middleware_instance_status(id: int) -> dict:
-    url = BACKEND_URL + f"/v1/middleware/management/instance/{id}/status"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("GET", "get_middleware_instance_status", f"/v1/middleware/management/instance/{id}/status")
+    return response.json()
 
 
 async def get_middleware_instance(name: str) -> MiddlewareInstance:
-    middleware_instances = await list_current_middleware_instances()
-    instance = list(
-        filter(
-            lambda x: x.name == name,
-            middleware_instances,
-        )
-    )
-    available_names = [instance.name for instance in middleware_instances]
-    if len(instance) == 0:
+    refreshed = False
+    if _middleware_instance_index_expired():
+        await list_current_middleware_instances()
+        refreshed = True
+    instance = _MIDDLEWARE_INSTANCE_INDEX.get(name)
+    if instance is None and not refreshed:
+        # the instance may have been created since the last refresh
+        await list_current_middleware_instances()
+        instance = _MIDDLEWARE_INSTANCE_INDEX.get(name)
+    if instance is None:
+        available_names = list(_MIDDLEWARE_INSTANCE_INDEX.keys())
         raise Exception(f"Middleware instance {name} not found, available names: {available_names}")
-    instance = instance[0]
     return instance
 
 
@@ -248,12 +554,8 @@ async def get_middleware_instance_id(name: str) -> int:
 
 
 async def backup_middleware_instance(id: int):
-    url = BACKEND_URL + f"/v1/middleware/management/backup/{id}/backup-immediately"
-    response = await async_client.post(url)
-    if response.status_code == 200:
-        return "OK"
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    await request("POST", "backup_middleware_instance", f"/v1/middleware/management/backup/{id}/backup-immediately")
+    return "OK"
 
 
 class AddMiddlewareInstanceNodesRequest(BaseModel):
@@ -263,12 +565,8 @@ class AddMiddlewareInstanceNodesRequest(BaseModel):
 
 
 async def add_middleware_instance_nodes(id: int, req: AddMiddlewareInstanceNodesRequest):
-    url = BACKEND_URL + f"/v1/middleware/management/instance/{id}/add-nodes"
-    response = await async_client.post(url, json=req.model_dump())
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("POST", "add_middleware_instance_nodes", f"/v1/middleware/management/instance/{id}/add-nodes", json=req.model_dump())
+    return response.json()
 
 
 class MiddlewareNodeInfo(BaseModel):
@@ -288,23 +586,15 @@ class MiddlewareNodeInfo(BaseModel):
 
 
 async def list_middleware_instance_nodes(id: int) -> List[MiddlewareNodeInfo]:
-    url = BACKEND_URL + f"/v1/middleware/management/instance/{id}/nodes"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        nodes = [MiddlewareNodeInfo(**node) for node in data]
-        return nodes
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("GET", "list_middleware_instance_nodes", f"/v1/middleware/management/instance/{id}/nodes")
+    data = response.json()
+    nodes = [MiddlewareNodeInfo(**node) for node in data]
+    return nodes
 
 
 async def remove_middleware_instance_nodes(id: int, node_ids: List[int]):
-    url = BACKEND_URL + f"/v1/middleware/management/instance/{id}/remove-nodes"
-    response = await async_client.post(url, json={"nodes": node_ids})
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("POST", "remove_middleware_instance_nodes", f"/v1/middleware/management/instance/{id}/remove-nodes", json={"nodes": node_ids})
+    return response.json()
 
 
 class MiddlewareInstanceChangeEvent(BaseModel):
@@ -316,30 +606,27 @@ class MiddlewareInstanceChangeEvent(BaseModel):
 
 
 async def get_middleware_instance_change_events(middleware_type: int, id: int) -> List[MiddlewareInstanceChangeEvent]:
-    url = BACKEND_URL + f"/v1/middleware/management/state-machine/{middleware_type}/{id}/changes?page=1&pageSize=20"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        events: list = data["list"]
-        result = []
-        for event in events:
-            event_val = event["event"]["desc"]
-            result_val = event["result"]["desc"]
-            create_time = from_unix_mill_to_datetime(event["create_at"])
-            update_time = from_unix_mill_to_datetime(event["update_at"])
-            status = f"""from {event["from"]} to {event["to"]}"""
-            result.append(
-                MiddlewareInstanceChangeEvent(
-                    event=event_val,
-                    result=result_val,
-                    status=status,
-                    create_time=create_time,
-                    update_time=update_time,
-                )
+    path = f"/v1/middleware/management/state-machine/{middleware_type}/{id}/changes?page=1&pageSize=20"
+    response = await request("GET", "get_middleware_instance_change_events", path)
+    data = response.json()
+    events: list = data["list"]
+    result = []
+    for event in events:
+        event_val = event["event"]["desc"]
+        result_val = event["result"]["desc"]
+        create_time = from_unix_mill_to_datetime(event["create_at"])
+        update_time = from_unix_mill_to_datetime(event["update_at"])
+        status = f"""from {event["from"]} to {event["to"]}"""
+        result.append(
+            MiddlewareInstanceChangeEvent(
+                event=event_val,
+                result=result_val,
+                status=status,
+                create_time=create_time,
+                update_time=update_time,
             )
-        return result
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+        )
+    return result
 
 
 ALERTLEVELS = {
@@ -371,13 +658,10 @@ class AlertRule(BaseModel):
 
 
 async def get_middleware_instance_alert_rule_json(name: str) -> list[dict]:
-    url = BACKEND_URL + f"/v1/monitor/event-rules?name=&zone=&domain=&service={name}&page_size=10"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        return data["data"]
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    path = f"/v1/monitor/event-rules?name=&zone=&domain=&service={name}&page_size=10"
+    response = await request("GET", "get_middleware_instance_alert_rules", path)
+    data = response.json()
+    return data["data"]
 
 
 async def get_middleware_instance_alert_rules(name: str) -> List[AlertRule]:
@@ -470,31 +754,309 @@ class MiddlewareInstanceLogs(BaseModel):
     data: List[dict]
 
 
-async def get_middleware_instance_log(name: str, start: int, end: int, log_type: str, page: int) -> MiddlewareInstanceLogs:
+class MiddlewareInstanceLogLines(BaseModel):
+    total_size: int
+    returned_size: int
+    truncated: bool
+    data: List[dict]
+
+
+class LogFilters(BaseModel):
+    keyword: str = ""
+    host_ipv4: str = ""
+    host_name: str = ""
+    node_name: str = ""
+
+
+async def _get_log_kind(name: str, log_type: str) -> str:
     instance = await get_middleware_instance(name)
     log_kind = get_log_kind_name(instance.middleware_type)
     if log_type not in LOGMAP[log_kind]:
         raise Exception(f"Error: {log_type} not supported, available types: {LOGMAP[log_kind]}")
-    url = (
-        BACKEND_URL
-        + f"/v1/monitor/middleware-logs?start={start}&end={end}&service={name}&keyword=&hostIpv4=&current_page={page}&page_size=50&kind={log_kind}&log_type={log_type}&host_name=&node_name="
+    return log_kind
+
+
+async def _get_middleware_instance_log_page(
+    name: str, log_kind: str, log_type: str, start: int, end: int, page: int, page_size: int, filters: LogFilters
+) -> dict:
+    query = urlencode(
+        {
+            "start": start,
+            "end": end,
+            "service": name,
+            "keyword": filters.keyword,
+            "hostIpv4": filters.host_ipv4,
+            "current_page": page,
+            "page_size": page_size,
+            "kind": log_kind,
+            "log_type": log_type,
+            "host_name": filters.host_name,
+            "node_name": filters.node_name,
+        }
+    )
+    response = await request("GET", "get_middleware_instance_log", f"/v1/monitor/middleware-logs?{query}")
+    return response.json()
+
+
+def _format_log_time(logs: List[dict]) -> List[dict]:
+    for log in logs:
+        log["log_time"] = from_unix_mill_to_datetime(int(log["log_time"]))
+    return logs
+
+
+def _limit_log_lines(logs: List[dict], max_lines: int, max_bytes: int) -> List[dict]:
+    # the leading lines that fit in max_lines and max_bytes of serialized lines
+    size = 0
+    for i, log in enumerate(logs[:max_lines]):
+        size += len(json.dumps(log))
+        if size > max_bytes:
+            return logs[:i]
+    return logs[:max_lines]
+
+
+async def get_middleware_instance_log(
+    name: str, start: int, end: int, log_type: str, page: int, filters: Optional[LogFilters] = None
+) -> MiddlewareInstanceLogs:
+    log_kind = await _get_log_kind(name, log_type)
+    data = await _get_middleware_instance_log_page(name, log_kind, log_type, start, end, page, LOG_PAGE_SIZE, filters or LogFilters())
+    logs = MiddlewareInstanceLogs(
+        total_size=data["total_size"],
+        current_page=data["current_page"],
+        page_size=data["page_size"],
+        data=_format_log_time(data["data"]),
+    )
+    return logs
+
+
+async def _collect_middleware_instance_logs(
+    name: str,
+    log_kind: str,
+    log_type: str,
+    start: int,
+    end: int,
+    filters: LogFilters,
+    max_lines: int,
+    max_bytes: int,
+    oldest_first: bool = False,
+    match: Optional[Callable[[dict], bool]] = None,
+) -> Tuple[int, List[dict], bool]:
+    """
+    Read the logs of the time range across pages: the total is read from the first page and
+    the following pages are fetched concurrently. Pages are kept in page order until `max_lines`
+    lines or `max_bytes` bytes of serialized lines are reached. With `oldest_first`, pages
+    returned newest first are read from the last page and backwards, so that the lines kept
+    are the oldest ones. With `match`, only the lines it accepts are kept and counted, and
+    pages are read until the limits are reached. Returns the total, the raw lines and whether
+    lines were left out.
+    """
+    page_size = LOG_BULK_PAGE_SIZE
+
+    async def fetch_page(page: int) -> dict:
+        data = await _get_middleware_instance_log_page(name, log_kind, log_type, start, end, page, page_size, filters)
+        data["current_page"] = page
+        return data
+
+    first = None
+    max_pages = math.ceil(max_lines / page_size) if match is None else None
+    if oldest_first:
+        first = await fetch_page(1)
+        first_lines = first["data"]
+        total = first.get("total_size", 0)
+        page_count = math.ceil(total / page_size)
+        if len(first_lines) > 1 and int(first_lines[0]["log_time"]) > int(first_lines[-1]["log_time"]):
+            backend_first, fetch_backend_page = first, fetch_page
+
+            async def fetch_page(page: int) -> dict:
+                data = backend_first if page == page_count else await fetch_backend_page(page_count + 1 - page)
+                return {**data, "current_page": page, "data": data["data"][::-1]}
+
+            # the page read first is the partial last one, the following ones are full
+            last_page_size = total - (page_count - 1) * page_size
+            first = None
+            if match is None:
+                max_pages = 1 + math.ceil(max(max_lines - last_page_size, 0) / page_size)
+
+    total_size = 0
+    arrived: Dict[int, List[dict]] = {}
+    lines: List[dict] = []
+    size = 0
+    truncated = False
+    next_page = 1
+    # pages arrive in any order, only pages following the ones kept can be kept
+    pages = iter_pages(fetch_page, page_size, total_key="total_size", items_key="data", max_pages=max_pages, first=first)
+    async with aclosing(pages):
+        async for data in pages:
+            total_size = max(total_size, data.get("total_size", 0))
+            arrived[data["current_page"]] = data["data"]
+            while next_page in arrived and not truncated:
+                # only the lines of the new page are measured, the kept ones are counted in size
+                for log in arrived.pop(next_page):
+                    if match is not None and not match(log):
+                        continue
+                    size += len(json.dumps(log))
+                    if len(lines) >= max_lines or size > max_bytes:
+                        truncated = True
+                        break
+                    lines.append(log)
+                next_page += 1
+            if truncated:
+                break
+    return total_size, lines, truncated or (match is None and len(lines) < total_size)
+
+
+async def get_all_middleware_instance_logs(
+    name: str, start: int, end: int, log_type: str, max_lines: int, max_bytes: int, filters: Optional[LogFilters] = None
+) -> MiddlewareInstanceLogLines:
+    """
+    Logs of the time range from all pages, in log time order, see _collect_middleware_instance_logs.
+    """
+    log_kind = await _get_log_kind(name, log_type)
+    total_size, lines, truncated = await _collect_middleware_instance_logs(name, log_kind, log_type, start, end, filters or LogFilters(), max_lines, max_bytes)
+    lines.sort(key=lambda log: int(log["log_time"]))
+    return MiddlewareInstanceLogLines(total_size=total_size, returned_size=len(lines), truncated=truncated, data=_format_log_time(lines))
+
+
+async def iter_middleware_instance_log_pages(
+    name: str, start: int, end: int, log_type: str, max_lines: int, filters: Optional[LogFilters] = None
+) -> AsyncIterator[List[dict]]:
+    """
+    Yield the lines of the time range page by page in arrival order, up to `max_lines` lines,
+    for callers that consume each page instead of keeping the lines.
+    """
+    log_kind = await _get_log_kind(name, log_type)
+    filters = filters or LogFilters()
+    page_size = LOG_BULK_PAGE_SIZE
+
+    async def fetch_page(page: int) -> dict:
+        return await _get_middleware_instance_log_page(name, log_kind, log_type, start, end, page, page_size, filters)
+
+    count = 0
+    async for data in iter_pages(fetch_page, page_size, total_key="total_size", items_key="data", max_pages=math.ceil(max_lines / page_size)):
+        page_lines = data["data"][: max_lines - count]
+        count += len(page_lines)
+        yield _format_log_time(page_lines)
+        if count >= max_lines:
+            break
+
+
+class LogCursor(BaseModel):
+    log_time: int
+    seen: Set[str]
+
+
+# (instance, log type, filters) -> last log time returned by a poll and the lines returned at that time,
+# least recently polled first
+_LOG_CURSORS: "OrderedDict[Tuple[str, str, str], LogCursor]" = OrderedDict()
+
+
+def _log_identity(log: dict) -> str:
+    return json.dumps(log, sort_keys=True)
+
+
+async def poll_middleware_instance_logs(
+    name: str, start: int, end: int, log_type: str, max_lines: int, max_bytes: int, filters: Optional[LogFilters] = None
+) -> MiddlewareInstanceLogLines:
+    """
+    Logs that arrived since the previous poll of the same instance, log type and filters. Only
+    the first poll reads from `start`, later ones from the last returned log time; lines at that
+    time that were already returned are dropped. When more lines arrived than the limits allow,
+    truncated is set, the oldest lines are returned and the cursor only moves past them.
+    """
+    log_kind = await _get_log_kind(name, log_type)
+    filters = filters or LogFilters()
+    key = (name, log_type, filters.model_dump_json())
+    cursor = _LOG_CURSORS.get(key)
+    if cursor is not None:
+        start = cursor.log_time
+    total_size, lines, truncated = await _collect_middleware_instance_logs(
+        name, log_kind, log_type, start, end, filters, max_lines, max_bytes, oldest_first=True
     )
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        log_data = []
-        for log in data["data"]:
-            log["log_time"] = from_unix_mill_to_datetime(int(log["log_time"]))
-            log_data.append(log)
-        logs = MiddlewareInstanceLogs(
-            total_size=data["total_size"],
-            current_page=data["current_page"],
-            page_size=data["page_size"],
-            data=log_data,
+    if cursor is not None:
+        fetched = len(lines)
+        lines = [
+            log
+            for log in lines
+            if int(log["log_time"]) > cursor.log_time or (int(log["log_time"]) == cursor.log_time and _log_identity(log) not in cursor.seen)
+        ]
+        total_size -= fetched - len(lines)
+    lines.sort(key=lambda log: int(log["log_time"]))
+
+    if len(lines) > 0:
+        last = int(lines[-1]["log_time"])
+        seen = {_log_identity(log) for log in lines if int(log["log_time"]) == last}
+        if cursor is not None and cursor.log_time == last:
+            seen |= cursor.seen
+        _LOG_CURSORS[key] = LogCursor(log_time=last, seen=seen)
+    elif cursor is None:
+        _LOG_CURSORS[key] = LogCursor(log_time=start, seen=set())
+    _LOG_CURSORS.move_to_end(key)
+    while len(_LOG_CURSORS) > LOG_CURSOR_MAX_ENTRIES:
+        _LOG_CURSORS.popitem(last=False)
+    return MiddlewareInstanceLogLines(total_size=total_size, returned_size=len(lines), truncated=truncated, data=_format_log_time(lines))
+
+
+async def search_middleware_instance_logs(
+    name: str,
+    start: int,
+    end: int,
+    log_type: str,
+    keywords: List[str],
+    mode: str,
+    max_lines: int,
+    max_bytes: int,
+    filters: Optional[LogFilters] = None,
+) -> MiddlewareInstanceLogLines:
+    """
+    Logs matching several keywords. With mode "or" every keyword is a concurrent query filtered
+    upstream and the lines matching any keyword are returned. With mode "and" only the keyword
+    matching the fewest lines is filtered upstream and the others are matched here, so that no
+    query is cut before the lines matching all keywords. The total size is the number of
+    matching lines found.
+    """
+    log_kind = await _get_log_kind(name, log_type)
+    filters = filters or LogFilters()
+    if mode == "and":
+        totals = await asyncio.gather(
+            *[
+                _get_middleware_instance_log_page(name, log_kind, log_type, start, end, 1, 1, filters.model_copy(update={"keyword": keyword}))
+                for keyword in keywords
+            ]
         )
-        return logs
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+        selective = min(zip(keywords, totals), key=lambda pair: pair[1].get("total_size", 0))[0]
+        others = [keyword.lower() for keyword in keywords if keyword != selective]
+        _, lines, truncated = await _collect_middleware_instance_logs(
+            name,
+            log_kind,
+            log_type,
+            start,
+            end,
+            filters.model_copy(update={"keyword": selective}),
+            max_lines,
+            max_bytes,
+            match=lambda log: all(keyword in log_text(log).lower() for keyword in others),
+        )
+        lines.sort(key=lambda log: int(log["log_time"]))
+        return MiddlewareInstanceLogLines(total_size=len(lines), returned_size=len(lines), truncated=truncated, data=_format_log_time(lines))
+
+    results = await asyncio.gather(
+        *[
+            _collect_middleware_instance_logs(name, log_kind, log_type, start, end, filters.model_copy(update={"keyword": keyword}), max_lines, max_bytes)
+            for keyword in keywords
+        ]
+    )
+    # identical lines may repeat, a line is kept as many times as the query returning it most often
+    merged: Dict[str, List[dict]] = {}
+    for _, lines, _ in results:
+        repeats: Dict[str, List[dict]] = defaultdict(list)
+        for log in lines:
+            repeats[_log_identity(log)].append(log)
+        for key, logs in repeats.items():
+            if len(logs) > len(merged.get(key, [])):
+                merged[key] = logs
+    lines = sorted((log for logs in merged.values() for log in logs), key=lambda log: int(log["log_time"]))
+    limited = _limit_log_lines(lines, max_lines, max_bytes)
+    truncated = len(limited) < len(lines) or any(truncated for _, _, truncated in results)
+    return MiddlewareInstanceLogLines(total_size=len(lines), returned_size=len(limited), truncated=truncated, data=_format_log_time(limited))
 
 
 class AuthorizationInfo(BaseModel):
@@ -508,14 +1070,24 @@ class AuthorizationInfo(BaseModel):
     resources: list
 
 
+# auth token -> authorizations, dropped whenever the backend answers 401
+_AUTHORIZATIONS: Dict[str, AuthorizationInfo] = {}
+
+
+def invalidate_authorizations():
+    _AUTHORIZATIONS.clear()
+
+
 async def get_authorizations() -> AuthorizationInfo:
-    url = BACKEND_URL + "/v1/control/my-authorizations"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        return AuthorizationInfo(**data)
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    token = get_token()
+    auth = _AUTHORIZATIONS.get(token)
+    if auth is not None:
+        return auth
+    response = await request("GET", "get_authorizations", "/v1/control/my-authorizations")
+    data = response.json()
+    auth = AuthorizationInfo(**data)
+    _AUTHORIZATIONS[token] = auth
+    return auth
 
 
 async def get_tenant_id() -> int:
@@ -523,14 +1095,11 @@ async def get_tenant_id() -> int:
     return auth.tenant_id
 
 
-async def get_monitor_data(tenant_id: int, data: dict) -> Any:
-    url = BACKEND_URL + f"/v1/monitor/tenants/{tenant_id}/time-series"
-    response = await async_client.post(url, json=data)
-    if response.status_code == 200:
-        result = response.json()
-        return result
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+async def get_monitor_data(tenant_id: int, body: str) -> Any:
+    # body is the pre-serialized JSON query; time-series queries are read-only, so they are safe to retry
+    response = await request("POST", "get_monitor_data", f"/v1/monitor/tenants/{tenant_id}/time-series", content=body, idempotent=True)
+    result = response.json()
+    return result
 
 
 class MiddlewareAlertMetric(BaseModel):
@@ -539,17 +1108,14 @@ class MiddlewareAlertMetric(BaseModel):
 
 
 async def get_middleware_alert_metrics(middleware_type_name: str) -> List[Dict]:
-    url = BACKEND_URL + f"/v1/monitor/dashboard-metric-trees?metric_type=origin&groups={middleware_type_name}"
-    response = await async_client.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        metrics = []
-        for m in data["root"][0]["children"][0]["children"][0]["children"]:
-            mm = MiddlewareAlertMetric(**m)
-            metrics.append(mm)
-        return metrics
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    path = f"/v1/monitor/dashboard-metric-trees?metric_type=origin&groups={middleware_type_name}"
+    response = await request("GET", "get_middleware_alert_metrics", path)
+    data = response.json()
+    metrics = []
+    for m in data["root"][0]["children"][0]["children"][0]["children"]:
+        mm = MiddlewareAlertMetric(**m)
+        metrics.append(mm)
+    return metrics
 
 
 class MiddlewareAlertRuleReq(BaseModel):
@@ -587,27 +1153,15 @@ def make_alert_rule_rule(count: int, duration: int, value: int, op: str, metric:
 
 
 async def create_middleware_alert_rule(req: MiddlewareAlertRuleReq):
-    url = BACKEND_URL + "/v1/monitor/event-rules"
-    response = await async_client.post(url, json=req.model_dump())
-    if response.status_code == 201:
-        return response.json()
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("POST", "create_middleware_alert_rule", "/v1/monitor/event-rules", json=req.model_dump(), expected_status=201)
+    return response.json()
 
 
 async def put_middleware_alert_rule(id: int, body: dict):
-    url = BACKEND_URL + f"/v1/monitor/event-rules/{id}"
-    response = await async_client.put(url, json=body)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("PUT", "put_middleware_alert_rule", f"/v1/monitor/event-rules/{id}", json=body)
+    return response.json()
 
 
 async def delete_middleware_alert_rule(id: int):
-    url = BACKEND_URL + f"/v1/monitor/event-rules/{id}"
-    response = await async_client.delete(url)
-    if response.status_code == 200:
-        return response.json()
-    else:
-        raise Exception(f"Error: {response.status_code} - {response.text}")
+    response = await request("DELETE", "delete_middleware_alert_rule", f"/v1/monitor/event-rules/{id}")
+    return response.json()
@@ -1,25 +1,78 @@
 import os
+from typing import Optional
 import httpx
-from megacloud_mcp.settings import ENV_AUTHTOKEN
+from megacloud_mcp.log import logger
+from megacloud_mcp.settings import (
+    BACKEND_URL,
+    ENV_AUTHTOKEN,
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT_IN_SECONDS,
+    HTTP_KEEPALIVE_EXPIRY_IN_SECONDS,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_READ_TIMEOUT_IN_SECONDS,
+)
 
 
-def get_header():
+def get_token() -> str:
     token = os.getenv(ENV_AUTHTOKEN, "")
     if token == "":
         raise ValueError(f"Environment variable {ENV_AUTHTOKEN} not set")
-    headers = {"Authorization": f"Bearer {token}"}
+    return token
+
+
+def get_header():
+    headers = {"Authorization": f"Bearer {get_token()}"}
     return headers
 
 
-def get_async_client():
-    client = httpx.AsyncClient(headers=get_header())
-    return client
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("MEGACLOUD_HTTP2 is set but the h2 package is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the shared async client, creating it on first use. All backend calls go
+    through this single connection pool.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            headers=get_header(),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_IN_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                HTTP_READ_TIMEOUT_IN_SECONDS,
+                connect=HTTP_CONNECT_TIMEOUT_IN_SECONDS,
+            ),
+            http2=HTTP2_ENABLED and _http2_available(),
+        )
+    return _async_client
 
 
-def get_client():
-    client = httpx.Client(headers=get_header())
-    return client
+async def warmup_async_client():
+    """
+    Open a connection to the backend (DNS, TCP and TLS handshake) ahead of the first tool call.
+    """
+    try:
+        await get_async_client().head(BACKEND_URL)
+    except httpx.HTTPError as e:
+        logger.warning(f"Failed to warm up connection to {BACKEND_URL}: {e}")
 
 
-client = get_client()
-async_client = get_async_client()
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
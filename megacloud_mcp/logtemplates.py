@@ -0,0 +1,135 @@
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from pydantic import BaseModel
+
+WILDCARD = "<*>"
+
+# keys holding the text of a log line, the first one present is used
+LOG_TEXT_KEYS = ("message", "msg", "content", "log", "line", "text")
+
+# tokens that are variables: numbers, ids, addresses, hashes, anything holding a digit
+_VARIABLE_TOKEN = re.compile(r"\d")
+
+
+class LogTemplate(BaseModel):
+    template: str
+    count: int
+    first_time: str
+    last_time: str
+    exemplars: List[str]
+
+
+class _Cluster:
+    __slots__ = ("tokens", "count", "first_time", "last_time", "exemplars")
+
+    def __init__(self, tokens: List[str], log_time: str):
+        self.tokens = tokens
+        self.count = 0
+        self.first_time = log_time
+        self.last_time = log_time
+        self.exemplars: List[str] = []
+
+
+def log_text(log: dict) -> str:
+    for key in LOG_TEXT_KEYS:
+        if isinstance(log.get(key), str):
+            return log[key]
+    return " ".join(f"{value}" for key, value in log.items() if key != "log_time")
+
+
+class TemplateMiner:
+    """
+    Streaming log template miner after Drain (He et al., ICWS 2017). Lines are routed through a
+    fixed depth tree keyed by their token count and first tokens, then matched against the
+    templates of the leaf by the share of equal tokens; positions that differ become wildcards.
+    Memory is bounded: at most `max_children` children per node, `max_clusters` templates
+    (the least recently matched one is dropped) and `max_exemplars` exemplars per template.
+    """
+
+    def __init__(
+        self,
+        depth: int = 4,
+        similarity: float = 0.4,
+        max_children: int = 100,
+        max_clusters: int = 1000,
+        max_exemplars: int = 3,
+    ):
+        self.prefix_length = max(depth - 2, 1)
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_exemplars = max_exemplars
+        self.root: Dict = {}
+        # all clusters, least recently matched first
+        self.clusters: "OrderedDict[int, _Cluster]" = OrderedDict()
+        self.leaves: Dict[int, List[_Cluster]] = {}
+
+    def _leaf(self, tokens: List[str]) -> List[_Cluster]:
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[: self.prefix_length]:
+            if _VARIABLE_TOKEN.search(token):
+                token = WILDCARD
+            child = node.get(token)
+            if child is None:
+                # a full node sends new tokens to its wildcard child
+                token = token if len(node) < self.max_children - 1 else WILDCARD
+                child = node.setdefault(token, {})
+            node = child
+        return node.setdefault(None, [])
+
+    def _match(self, leaf: List[_Cluster], tokens: List[str]) -> Optional[_Cluster]:
+        best, best_score, best_wildcards = None, -1.0, -1
+        for cluster in leaf:
+            equal = wildcards = 0
+            for template_token, token in zip(cluster.tokens, tokens):
+                if template_token == WILDCARD:
+                    wildcards += 1
+                elif template_token == token:
+                    equal += 1
+            score = equal / len(tokens)
+            if score > best_score or (score == best_score and wildcards > best_wildcards):
+                best, best_score, best_wildcards = cluster, score, wildcards
+        return best if best is not None and best_score >= self.similarity else None
+
+    def add(self, text: str, log_time: str = ""):
+        tokens = text.split()
+        if len(tokens) == 0:
+            return
+        leaf = self._leaf(tokens)
+        cluster = self._match(leaf, tokens)
+        if cluster is None:
+            cluster = _Cluster([WILDCARD if _VARIABLE_TOKEN.search(token) else token for token in tokens], log_time)
+            leaf.append(cluster)
+            self.leaves[id(cluster)] = leaf
+            self.clusters[id(cluster)] = cluster
+            if len(self.clusters) > self.max_clusters:
+                _, evicted = self.clusters.popitem(last=False)
+                self.leaves.pop(id(evicted)).remove(evicted)
+        else:
+            cluster.tokens = [template_token if template_token == token else WILDCARD for template_token, token in zip(cluster.tokens, tokens)]
+            self.clusters.move_to_end(id(cluster))
+
+        cluster.count += 1
+        if log_time:
+            cluster.first_time = min(cluster.first_time, log_time) if cluster.first_time else log_time
+            cluster.last_time = max(cluster.last_time, log_time)
+        if len(cluster.exemplars) < self.max_exemplars and text not in cluster.exemplars:
+            cluster.exemplars.append(text)
+
+    def add_logs(self, logs: Iterable[dict]):
+        for log in logs:
+            self.add(log_text(log), f"{log.get('log_time', '')}")
+
+    def templates(self, limit: Optional[int] = None) -> List[LogTemplate]:
+        clusters = sorted(self.clusters.values(), key=lambda cluster: -cluster.count)
+        return [
+            LogTemplate(
+                template=" ".join(cluster.tokens),
+                count=cluster.count,
+                first_time=cluster.first_time,
+                last_time=cluster.last_time,
+                exemplars=cluster.exemplars,
+            )
+            for cluster in clusters[:limit]
+        ]
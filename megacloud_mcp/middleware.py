@@ -1,14 +1,21 @@
+import asyncio
 import json
-from typing import Dict, List, Optional
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from pydantic import BaseModel
 
 from megacloud_mcp import apis
 from megacloud_mcp import utils
 from megacloud_mcp import schema
 from megacloud_mcp import monitor
+from megacloud_mcp import logtemplates
+from megacloud_mcp.settings import FLEET_SCAN_CONCURRENCY
 
 REDIS_NAME = "Redis"
 
+# (progress, total) reporter of a long running tool call
+ProgressFunc = Callable[[float, Optional[float]], Awaitable[None]]
+
 
 class CreateSingleNodeMiddlewareRequest(BaseModel):
     middleware_name: str
@@ -158,18 +165,8 @@ async def create_cluster_redis(req: schema.CreateRedisClusterSchema):
 
 
 async def change_middleware_state(name: str, operation: int):
-    middleware_instances = await apis.list_current_middleware_instances()
-    instance = list(
-        filter(
-            lambda x: x.name == name,
-            middleware_instances,
-        )
-    )
-    available_names = [instance.name for instance in middleware_instances]
-    if len(instance) == 0:
-        raise Exception(f"Middleware instance {name} not found, available names: {available_names}")
-    instance = instance[0]
-    resp = await apis.put_middleware_instance(instance.instance_id, operation)
+    id = await apis.get_middleware_instance_id(name)
+    resp = await apis.put_middleware_instance(id, operation)
     return resp
 
 
@@ -301,73 +298,216 @@ async def get_middleware_instance_alert_rules(name: str):
     return result
 
 
-async def get_middleware_instance_logs(arg: schema.MiddlewareLogSchema):
+async def follow_middleware_instance_logs(arg: schema.MiddlewareLogSchema, filters: apis.LogFilters, report_progress: Optional[ProgressFunc] = None):
+    """
+    Poll for new log lines every poll_interval_in_seconds until follow_timeout_in_seconds has
+    passed or max_lines lines arrived, reporting the number of lines so far after each poll.
+    The first poll of an instance and log type reads the last time_interval_in_minutes.
+    """
+    deadline = time.monotonic() + arg.follow_timeout_in_seconds
+    lines: List[dict] = []
+    size = 0
+    truncated = False
+    while True:
+        start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
+        result = await apis.poll_middleware_instance_logs(
+            arg.middleware_instance_name, start_time, end_time, arg.log_type, arg.max_lines - len(lines), arg.max_bytes - size, filters
+        )
+        lines.extend(result.data)
+        size += sum(len(json.dumps(log)) for log in result.data)
+        truncated = truncated or result.truncated
+        if report_progress is not None:
+            await report_progress(len(lines), arg.max_lines)
+        if truncated or len(lines) >= arg.max_lines or time.monotonic() + arg.poll_interval_in_seconds > deadline:
+            break
+        await asyncio.sleep(arg.poll_interval_in_seconds)
+    return apis.MiddlewareInstanceLogLines(total_size=len(lines), returned_size=len(lines), truncated=truncated, data=lines)
+
+
+async def get_middleware_instance_logs(arg: schema.MiddlewareLogSchema, report_progress: Optional[ProgressFunc] = None):
+    if arg.output == "templates":
+        return await mine_middleware_instance_log_templates(arg, report_progress)
+    return await fetch_middleware_instance_logs(arg, report_progress)
+
+
+def _log_keywords_and_filters(arg: schema.MiddlewareLogSchema) -> Tuple[List[str], apis.LogFilters]:
+    keywords = list(arg.keywords) if arg.keywords else []
+    if arg.keyword and arg.keyword not in keywords:
+        keywords.insert(0, arg.keyword)
+    filters = apis.LogFilters(
+        keyword=keywords[0] if len(keywords) == 1 else "",
+        host_ipv4=arg.host_ipv4 or "",
+        host_name=arg.host_name or "",
+        node_name=arg.node_name or "",
+    )
+    return keywords, filters
+
+
+async def mine_middleware_instance_log_templates(arg: schema.MiddlewareLogSchema, report_progress: Optional[ProgressFunc] = None):
+    """
+    Collapse up to max_lines lines of the time range into their templates. Each page is fed to
+    the miner as it arrives, so max_bytes does not apply. Follow mode and several keywords need
+    the lines themselves to skip lines already seen, their collected lines are mined instead.
+    """
+    miner = logtemplates.TemplateMiner()
+    keywords, filters = _log_keywords_and_filters(arg)
+    if arg.follow or len(keywords) > 1:
+        result = await fetch_middleware_instance_logs(arg, report_progress)
+        miner.add_logs(result.data)
+        return miner.templates(arg.max_templates)
+
     start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await apis.get_middleware_instance_log(arg.middleware_instance_name, start_time, end_time, arg.log_type, arg.current_page)
-    return result
+    mined = 0
+    async for page in apis.iter_middleware_instance_log_pages(arg.middleware_instance_name, start_time, end_time, arg.log_type, arg.max_lines, filters):
+        miner.add_logs(page)
+        mined += len(page)
+        if report_progress is not None:
+            await report_progress(mined, arg.max_lines)
+    return miner.templates(arg.max_templates)
 
 
-async def get_monitor_data_of_host_load(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
+async def fetch_middleware_instance_logs(arg: schema.MiddlewareLogSchema, report_progress: Optional[ProgressFunc] = None):
     start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_load(tenant_id, arg.host_name, start_time, end_time)
+    keywords, filters = _log_keywords_and_filters(arg)
+    name, log_type = arg.middleware_instance_name, arg.log_type
+    if arg.follow:
+        if len(keywords) > 1:
+            raise Exception("Follow mode supports a single keyword")
+        return await follow_middleware_instance_logs(arg, filters, report_progress)
+    if len(keywords) > 1:
+        return await apis.search_middleware_instance_logs(name, start_time, end_time, log_type, keywords, arg.keyword_mode, arg.max_lines, arg.max_bytes, filters)
+    if arg.all_pages:
+        return await apis.get_all_middleware_instance_logs(name, start_time, end_time, log_type, arg.max_lines, arg.max_bytes, filters)
+    result = await apis.get_middleware_instance_log(name, start_time, end_time, log_type, arg.current_page, filters)
     return result
 
 
-async def get_monitor_data_of_host_net_err_out(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
+async def resolve_host_names(arg: schema.HostNameTimeIntervalSchema) -> List[str]:
+    if arg.all_hosts:
+        hosts = await apis.list_available_hosts()
+        return [host.host_name for host in hosts]
+    host_names = list(arg.host_names) if arg.host_names else []
+    if arg.host_name and arg.host_name not in host_names:
+        host_names.insert(0, arg.host_name)
+    if len(host_names) == 0:
+        raise Exception("One of host_name, host_names or all_hosts must be provided")
+    return host_names
+
+
+async def query_host_monitor_data(arg: schema.HostNameTimeIntervalSchema, fetch: monitor.HostMonitorFunc):
+    tenant_id, hosts = await asyncio.gather(apis.get_tenant_id(), resolve_host_names(arg))
     start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_net_err_out(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    result = await monitor.query_hosts(fetch, tenant_id, hosts, start_time, end_time)
+    return monitor.format_monitor_data(result, arg)
+
+
+async def get_monitor_data_of_host_load(arg: schema.HostNameTimeIntervalSchema):
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_load)
+
+
+async def get_monitor_data_of_host_net_err_out(arg: schema.HostNameTimeIntervalSchema):
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_net_err_out)
 
 
 async def get_monitor_data_of_host_net_err_in(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
-    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_net_err_in(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_net_err_in)
 
 
 async def get_monitor_data_of_host_disk(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
-    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_disk(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_disk)
 
 
 async def get_monitor_data_of_host_disk_input_output(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
-    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_disk_input_output(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_disk_input_output)
 
 
 async def get_monitor_data_of_host_net_bytes_sent(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
-    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_net_bytes_sent(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_net_bytes_sent)
 
 
 async def get_monitor_data_of_host_net_bytes_recv(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
-    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_net_bytes_recv(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_net_bytes_recv)
 
 
 async def get_monitor_data_of_host_memory(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
-    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_memory(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_memory)
 
 
 async def get_monitor_data_of_host_cpu(arg: schema.HostNameTimeIntervalSchema):
-    tenant_id = await apis.get_tenant_id()
+    return await query_host_monitor_data(arg, monitor.get_monitor_data_of_host_cpu)
+
+
+async def get_host_overview(arg: schema.HostNameTimeIntervalSchema):
+    tenant_id, hosts = await asyncio.gather(apis.get_tenant_id(), resolve_host_names(arg))
     start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
-    result = await monitor.get_monitor_data_of_host_cpu(tenant_id, arg.host_name, start_time, end_time)
-    return result
+    result = await monitor.get_host_overview(tenant_id, hosts, start_time, end_time)
+    return monitor.format_monitor_data(result, arg)
+
+
+async def resolve_host_names_or_all(host_names: Optional[List[str]]) -> List[str]:
+    if host_names:
+        return host_names
+    hosts = await apis.list_available_hosts()
+    return [host.host_name for host in hosts]
+
+
+async def top_hosts(arg: schema.TopHostsSchema):
+    tenant_id, hosts = await asyncio.gather(apis.get_tenant_id(), resolve_host_names_or_all(arg.host_names))
+    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
+    rows = await monitor.top_hosts(tenant_id, hosts, arg.metric, arg.score, arg.limit, start_time, end_time)
+    return utils.to_table(rows)
+
+
+async def forecast_host_disk_usage(arg: schema.DiskForecastSchema):
+    tenant_id, hosts = await asyncio.gather(apis.get_tenant_id(), resolve_host_names_or_all(arg.host_names))
+    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
+    rows = await monitor.forecast_host_disk_usage(tenant_id, hosts, start_time, end_time, arg.method)
+    return utils.to_table(rows[: arg.limit])
+
+
+async def correlate_middleware_with_hosts(arg: schema.MiddlewareHostCorrelationSchema):
+    id = await apis.get_middleware_instance_id(arg.middleware_instance_name)
+    tenant_id, nodes, query = await asyncio.gather(
+        apis.get_tenant_id(),
+        apis.list_middleware_instance_nodes(id),
+        monitor.get_monitor_metrics(arg.middleware_instance_name, arg.metric_name),
+    )
+    node_hosts = {node.node_name: node.host_name for node in nodes}
+    if len(node_hosts) == 0:
+        raise Exception(f"Middleware instance {arg.middleware_instance_name} has no nodes")
+    families = arg.host_metrics or list(monitor.HOST_MONITOR_FAMILIES.keys())
+    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
+    rows = await monitor.correlate_middleware_with_hosts(
+        tenant_id,
+        arg.middleware_instance_name,
+        node_hosts,
+        query,
+        families,
+        start_time,
+        end_time,
+        arg.step_in_seconds * 1000,
+        arg.max_lag_steps,
+    )
+    return utils.to_table(rows[: arg.limit])
+
+
+async def scan_middleware_fleet(arg: schema.MiddlewareFleetScanSchema):
+    # the inventory is loaded once and shared by every check of the scan
+    tenant_id, instances = await asyncio.gather(apis.get_tenant_id(), apis.list_current_middleware_instances())
+    if arg.middleware_names:
+        wanted = {name.lower() for name in arg.middleware_names}
+        instances = [instance for instance in instances if instance.middleware_name.lower() in wanted]
+    start_time, end_time = utils.get_start_end_time(arg.time_interval_in_minutes)
+    report = await monitor.scan_middleware_fleet(
+        tenant_id,
+        instances,
+        start_time,
+        end_time,
+        monitor_types=arg.monitor_types,
+        concurrency=arg.concurrency or FLEET_SCAN_CONCURRENCY,
+    )
+    report.anomalies = report.anomalies[: arg.limit]
+    return report
 
 
 async def create_middleware_alert_rule(arg: schema.CreateAlertRuleSchema):
@@ -1,112 +1,422 @@
-from typing import Any, Dict, List, Type
-from megacloud_mcp import apis, schema, utils
+import asyncio
+import functools
+import heapq
+import json
+import math
+import re
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Tuple, Type
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+from megacloud_mcp import apis, schema, timeseries, utils
+from megacloud_mcp.log import logger
+from megacloud_mcp.settings import (
+    FLEET_SCAN_CONCURRENCY,
+    FLEET_SCAN_SCORE_THRESHOLD,
+    FLEET_SCAN_SERVICE_BATCH_SIZE,
+    HOST_FILTER_MAX_SIZE,
+    MONITOR_QUERY_CONCURRENCY,
+    TIME_SERIES_CACHE_MAX_ENTRIES,
+    TIME_SERIES_CACHE_STEP_IN_SECONDS,
+    TIME_SERIES_CHUNK_IN_MINUTES,
+)
 
 
-async def get_monitor_data_of_host_load(tenant_id: int, host: str, start: int, end: int) -> List[Dict]:
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [
-            {"name": "serverinfo-system-load1-avg-metric"},
-            {"name": "serverinfo-system-load5-avg-metric"},
-            {"name": "serverinfo-system-load15-avg-metric"},
-        ],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+class MetricQuery(BaseModel):
+    """
+    An immutable, compiled list of metric specs. `metrics_json` is the pre-serialized "metrics"
+    field of a time-series request, only the filters and time range are spliced in per call.
+    """
 
+    model_config = ConfigDict(frozen=True)
 
-async def get_monitor_data_of_host_net_err_out(tenant_id: int, host: str, start: int, end: int) -> Dict:
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [{"name": "serverinfo-net-err-out-ratio-metric"}],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+    metrics_json: str
 
+    @classmethod
+    def compile(cls, metrics: List[Dict]) -> "MetricQuery":
+        return cls(metrics_json=json.dumps(metrics, separators=(",", ":")))
 
-async def get_monitor_data_of_host_net_err_in(tenant_id: int, host: str, start: int, end: int) -> Dict:
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [{"name": "serverinfo-net-err-in-ratio-metric"}],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+    @property
+    def metrics(self) -> List[Dict]:
+        # a fresh copy on every access, the compiled query itself can not be changed
+        return json.loads(self.metrics_json)
 
 
-async def get_monitor_data_of_host_disk(tenant_id: int, host: str, start: int, end: int) -> Dict:
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [
-            {"name": "serverinfo-disk-total-metric", "functions": [{"kind": "max"}], "groups": [{"by": "path.keyword"}]},
-            {"name": "serverinfo-disk-used-metric", "functions": [{"kind": "max"}], "groups": [{"by": "path.keyword"}]},
-        ],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+@functools.lru_cache(maxsize=None)
+def group_metrics_by(query: MetricQuery, tag: str) -> MetricQuery:
+    return MetricQuery.compile([{**metric, "groups": [*metric.get("groups", []), {"by": tag}]} for metric in query.metrics])
 
 
-async def get_monitor_data_of_host_disk_input_output(tenant_id: int, host: str, start: int, end: int):
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [{"name": "serverinfo-diskio-read-bytes-ratio-metric"}, {"name": "serverinfo-diskio-write-bytes-ratio-metric"}],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+def time_series_body(filters_json: str, start: int, end: int, query: MetricQuery) -> str:
+    return f'{{"filters":{filters_json},"start":{start},"end":{end},"metrics":{query.metrics_json}}}'
 
 
-async def get_monitor_data_of_host_net_bytes_sent(tenant_id: int, host: str, start: int, end: int):
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [{"name": "serverinfo-net-bytes-sent-ratio-metric"}],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+class TimeSeriesCacheEntry(BaseModel):
+    start: int
+    end: int
+    result: Any
 
 
-async def get_monitor_data_of_host_net_bytes_recv(tenant_id: int, host: str, start: int, end: int):
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [{"name": "serverinfo-net-bytes-recv-ratio-metric"}],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+# query (tenant, filters, metrics, step, resolution class) -> bucket aligned result, least recently used first
+_TIME_SERIES_CACHE: "OrderedDict[str, TimeSeriesCacheEntry]" = OrderedDict()
 
 
-async def get_monitor_data_of_host_memory(tenant_id: int, host: str, start: int, end: int):
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [
-            {"name": "serverinfo-mem-used-avg-metric"},
-            {"name": "serverinfo-mem-buffered-avg-metric"},
-            {"name": "serverinfo-mem-cached-avg-metric"},
-            {"name": "serverinfo-mem-free-avg-metric"},
-        ],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+def _resolution_class(start: int, end: int) -> int:
+    """
+    Class of the resolution the backend answers [start, end] with. The resolution follows the
+    length of each query, which is at most TIME_SERIES_CHUNK_IN_MINUTES for a chunked window,
+    so windows whose queries have a length within the same power of two share a class.
+    """
+    minutes = math.ceil((end - start) / 60_000)
+    if minutes > TIME_SERIES_CHUNK_IN_MINUTES:
+        minutes = math.ceil(minutes / math.ceil(minutes / TIME_SERIES_CHUNK_IN_MINUTES))
+    return minutes.bit_length()
 
 
-async def get_monitor_data_of_host_cpu(tenant_id: int, host: str, start: int, end: int):
-    d = {
-        "filters": [{"name": "host_name", "values": [host]}],
-        "start": start,
-        "end": end,
-        "metrics": [
-            {"name": "serverinfo-cpu-usage-system-avg-metric"},
-            {"name": "serverinfo-cpu-usage-user-avg-metric"},
-            {"name": "serverinfo-cpu-usage-iowait-avg-metric"},
-            {"name": "serverinfo-cpu-usage-idle-avg-metric"},
-        ],
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+def _slice_result(result: Any, start: int, end: int) -> Any:
+    return timeseries.map_series(result, lambda points: timeseries.slice_series(points, start, end))
+
+
+def _merge_tail(cached: Any, tail: Any, tail_start: int) -> Optional[Any]:
+    """
+    Extend the cached series with the freshly fetched tail. Returns None when the two can not
+    be merged safely: ambiguous series labels, a cached series missing from the tail (it had no
+    point in the last bucket and would be dropped) or a different resolution in the tail.
+    """
+    history: Dict = {}
+    for labels, points in timeseries.iter_series(cached):
+        if labels in history:
+            return None
+        history[labels] = points
+    if not set(history).issubset(labels for labels, _ in timeseries.iter_series(tail)):
+        return None
+
+    mergeable = True
+
+    def merge(labels, points):
+        nonlocal mergeable
+        old = history.get(labels, [])
+        old_step, new_step = timeseries.median_step(old), timeseries.median_step(points)
+        if old_step and new_step and not math.isclose(old_step, new_step, rel_tol=0.01):
+            mergeable = False
+        return timeseries.slice_series(old, -math.inf, tail_start - 1) + points if old else points
+
+    merged = timeseries.map_labelled_series(tail, merge)
+    return merged if mergeable else None
+
+
+async def _fetch_time_series(tenant_id: int, filters_json: str, query: MetricQuery, start: int, end: int, step: int) -> Any:
+    """
+    Fetch [start, end], splitting windows longer than TIME_SERIES_CHUNK_IN_MINUTES into equal
+    step aligned chunks that are fetched concurrently and merged in order.
+    """
+    chunk = TIME_SERIES_CHUNK_IN_MINUTES * 60 * 1000
+    if end - start <= chunk:
+        return await apis.get_monitor_data(tenant_id, time_series_body(filters_json, start, end, query))
+    count = math.ceil((end - start) / chunk)
+    size = math.ceil((end - start) / count / step) * step
+    bounds = [(lo, min(lo + size, end)) for lo in range(start, end, size)]
+    results = await utils.gather_with_concurrency(
+        MONITOR_QUERY_CONCURRENCY,
+        [apis.get_monitor_data(tenant_id, time_series_body(filters_json, lo, hi, query)) for lo, hi in bounds],
+    )
+    return timeseries.concat_results(results)
+
+
+async def get_time_series(tenant_id: int, filters: List[Dict], query: MetricQuery, start: int, end: int) -> Any:
+    """
+    Query the time-series endpoint through a cache of bucket aligned results. The window is
+    aligned to TIME_SERIES_CACHE_STEP_IN_SECONDS; when an earlier result covers the start of
+    the window only the tail since its last bucket is fetched, and a window within the last
+    cached bucket is served from memory. Windows of a different resolution class are cached
+    apart, a short window is never served from the coarser points of a long one.
+    """
+    step = TIME_SERIES_CACHE_STEP_IN_SECONDS * 1000
+    start = start // step * step
+    end = -(-end // step) * step
+    filters_json = json.dumps(filters, separators=(",", ":"))
+    key = f"{tenant_id}|{step}|{_resolution_class(start, end)}|{filters_json}|{query.metrics_json}"
+
+    entry = _TIME_SERIES_CACHE.get(key)
+    result = None
+    if entry is not None and entry.start <= start <= entry.end:
+        if end <= entry.end:
+            _TIME_SERIES_CACHE.move_to_end(key)
+            return _slice_result(entry.result, start, end)
+        # refetch the last cached bucket as well, it may have been incomplete
+        tail_start = entry.end - step
+        tail = await _fetch_time_series(tenant_id, filters_json, query, tail_start, end, step)
+        result = _merge_tail(entry.result, tail, tail_start)
+    if result is None:
+        result = await _fetch_time_series(tenant_id, filters_json, query, start, end, step)
+
+    result = _slice_result(result, start, end)
+    _TIME_SERIES_CACHE[key] = TimeSeriesCacheEntry(start=start, end=end, result=result)
+    _TIME_SERIES_CACHE.move_to_end(key)
+    while len(_TIME_SERIES_CACHE) > TIME_SERIES_CACHE_MAX_ENTRIES:
+        _TIME_SERIES_CACHE.popitem(last=False)
+    return result
+
+
+async def query_host_metrics(tenant_id: int, hosts: List[str], start: int, end: int, query: MetricQuery, group_by_host: Optional[bool] = None) -> Any:
+    # group_by_host is given by query_hosts so that every batch of a query has the same shape
+    if group_by_host if group_by_host is not None else len(hosts) > 1:
+        # keep the series of each host apart instead of aggregating them together
+        query = group_metrics_by(query, "host_name")
+    return await get_time_series(tenant_id, [{"name": "host_name", "values": hosts}], query, start, end)
+
+
+HOST_LOAD_METRICS = MetricQuery.compile(
+    [
+        {"name": "serverinfo-system-load1-avg-metric"},
+        {"name": "serverinfo-system-load5-avg-metric"},
+        {"name": "serverinfo-system-load15-avg-metric"},
+    ]
+)
+HOST_NET_ERR_OUT_METRICS = MetricQuery.compile([{"name": "serverinfo-net-err-out-ratio-metric"}])
+HOST_NET_ERR_IN_METRICS = MetricQuery.compile([{"name": "serverinfo-net-err-in-ratio-metric"}])
+HOST_DISK_TOTAL_METRICS = MetricQuery.compile([{"name": "serverinfo-disk-total-metric", "functions": [{"kind": "max"}], "groups": [{"by": "path.keyword"}]}])
+HOST_DISK_USED_METRICS = MetricQuery.compile([{"name": "serverinfo-disk-used-metric", "functions": [{"kind": "max"}], "groups": [{"by": "path.keyword"}]}])
+HOST_DISK_METRICS = MetricQuery.compile(HOST_DISK_TOTAL_METRICS.metrics + HOST_DISK_USED_METRICS.metrics)
+HOST_DISK_INPUT_OUTPUT_METRICS = MetricQuery.compile(
+    [{"name": "serverinfo-diskio-read-bytes-ratio-metric"}, {"name": "serverinfo-diskio-write-bytes-ratio-metric"}]
+)
+HOST_NET_BYTES_SENT_METRICS = MetricQuery.compile([{"name": "serverinfo-net-bytes-sent-ratio-metric"}])
+HOST_NET_BYTES_RECV_METRICS = MetricQuery.compile([{"name": "serverinfo-net-bytes-recv-ratio-metric"}])
+HOST_MEMORY_METRICS = MetricQuery.compile(
+    [
+        {"name": "serverinfo-mem-used-avg-metric"},
+        {"name": "serverinfo-mem-buffered-avg-metric"},
+        {"name": "serverinfo-mem-cached-avg-metric"},
+        {"name": "serverinfo-mem-free-avg-metric"},
+    ]
+)
+HOST_CPU_METRICS = MetricQuery.compile(
+    [
+        {"name": "serverinfo-cpu-usage-system-avg-metric"},
+        {"name": "serverinfo-cpu-usage-user-avg-metric"},
+        {"name": "serverinfo-cpu-usage-iowait-avg-metric"},
+        {"name": "serverinfo-cpu-usage-idle-avg-metric"},
+    ]
+)
+
+
+async def get_monitor_data_of_host_load(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None) -> List[Dict]:
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_LOAD_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_net_err_out(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None) -> Dict:
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_NET_ERR_OUT_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_net_err_in(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None) -> Dict:
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_NET_ERR_IN_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_disk(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None) -> Dict:
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_DISK_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_disk_input_output(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None):
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_DISK_INPUT_OUTPUT_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_net_bytes_sent(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None):
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_NET_BYTES_SENT_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_net_bytes_recv(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None):
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_NET_BYTES_RECV_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_memory(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None):
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_MEMORY_METRICS, group_by_host)
+
+
+async def get_monitor_data_of_host_cpu(tenant_id: int, hosts: List[str], start: int, end: int, group_by_host: Optional[bool] = None):
+    return await query_host_metrics(tenant_id, hosts, start, end, HOST_CPU_METRICS, group_by_host)
+
+
+# single metric queries host rankings are computed on, see schema.TopHostsSchema
+TOP_HOST_METRICS = {
+    "cpu_user": MetricQuery.compile([{"name": "serverinfo-cpu-usage-user-avg-metric"}]),
+    "cpu_system": MetricQuery.compile([{"name": "serverinfo-cpu-usage-system-avg-metric"}]),
+    "cpu_iowait": MetricQuery.compile([{"name": "serverinfo-cpu-usage-iowait-avg-metric"}]),
+    "memory_used": MetricQuery.compile([{"name": "serverinfo-mem-used-avg-metric"}]),
+    "load1": MetricQuery.compile([{"name": "serverinfo-system-load1-avg-metric"}]),
+    "load5": MetricQuery.compile([{"name": "serverinfo-system-load5-avg-metric"}]),
+    "load15": MetricQuery.compile([{"name": "serverinfo-system-load15-avg-metric"}]),
+    "disk_used": HOST_DISK_USED_METRICS,
+    "disk_read_bytes": MetricQuery.compile([{"name": "serverinfo-diskio-read-bytes-ratio-metric"}]),
+    "disk_write_bytes": MetricQuery.compile([{"name": "serverinfo-diskio-write-bytes-ratio-metric"}]),
+    "net_bytes_sent": MetricQuery.compile([{"name": "serverinfo-net-bytes-sent-ratio-metric"}]),
+    "net_bytes_recv": MetricQuery.compile([{"name": "serverinfo-net-bytes-recv-ratio-metric"}]),
+    "net_err_in": MetricQuery.compile([{"name": "serverinfo-net-err-in-ratio-metric"}]),
+    "net_err_out": MetricQuery.compile([{"name": "serverinfo-net-err-out-ratio-metric"}]),
+}
+
+
+def series_owner(labels: tuple, names: List[str]) -> Optional[str]:
+    """
+    The name of `names` a series belongs to, found among its label values. A single name owns every series.
+    """
+    if len(names) == 1:
+        return names[0]
+    values = {label.split("=", 1)[-1] for label in labels}
+    return next((name for name in names if name in values), None)
+
+
+def format_monitor_data(result: Any, arg: schema.MonitorOutputSchema) -> Any:
+    if arg.transform != "none" or arg.resample_step_in_seconds:
+        step = arg.resample_step_in_seconds * 1000 if arg.resample_step_in_seconds else None
+        result = timeseries.map_series(result, lambda points: timeseries.transform_series(points, arg.transform, step))
+    if arg.output == "summary":
+        return utils.to_table(timeseries.summarize_result(result))
+    if arg.output == "anomalies":
+        rows = timeseries.anomalies_result(result, arg.anomaly_method, arg.anomaly_threshold, arg.anomaly_window, arg.season_in_minutes * 60_000)
+        for row in rows:
+            row["start"], row["end"] = utils.from_unix_mill_to_datetime(row["start"]), utils.from_unix_mill_to_datetime(row["end"])
+        return utils.to_table(rows) if rows else "No anomalies found"
+    if arg.max_points:
+        result = timeseries.downsample_result(result, arg.max_points, arg.downsample_method)
+    return result
+
+
+# (tenant_id, hosts, start, end, group_by_host=...) -> backend result
+HostMonitorFunc = Callable[..., Awaitable[Any]]
+
+
+async def query_hosts(fetch: HostMonitorFunc, tenant_id: int, hosts: List[str], start: int, end: int) -> Any:
+    """
+    Run a host monitor query for many hosts, batching them into requests of at most
+    HOST_FILTER_MAX_SIZE hosts that run concurrently. A single batch returns the backend
+    result as is, several batches return the list of batch results. Series are grouped by
+    host whenever more than one host is queried, also in a batch holding a single host.
+    """
+    batches = await query_host_batches(fetch, tenant_id, hosts, start, end)
+    if len(batches) == 1:
+        return batches[0][1]
+    return [result for _, result in batches]
+
+
+async def query_host_batches(fetch: HostMonitorFunc, tenant_id: int, hosts: List[str], start: int, end: int) -> List[Tuple[List[str], Any]]:
+    """
+    Like query_hosts, but returns (batch hosts, batch result) pairs so that series can be
+    attributed to the hosts of their own batch.
+    """
+    batches = utils.chunks(hosts, HOST_FILTER_MAX_SIZE)
+    group_by_host = len(hosts) > 1
+    results = await utils.gather_with_concurrency(
+        MONITOR_QUERY_CONCURRENCY, [fetch(tenant_id, batch, start, end, group_by_host=group_by_host) for batch in batches]
+    )
+    return list(zip(batches, results))
+
+
+def iter_host_series(batches: List[Tuple[List[str], Any]]):
+    """
+    Yield (host, labels, points) for every series of query_host_batches results. Series that
+    can not be attributed to a host are logged and skipped.
+    """
+    for hosts, result in batches:
+        for labels, points in timeseries.iter_series(result):
+            host = series_owner(labels, hosts)
+            if host is None:
+                logger.warning(f"Skipping series {' '.join(labels)}: no host of {hosts} found in its labels")
+                continue
+            yield host, labels, points
+
+
+HOST_MONITOR_FAMILIES = {
+    "cpu": get_monitor_data_of_host_cpu,
+    "memory": get_monitor_data_of_host_memory,
+    "load": get_monitor_data_of_host_load,
+    "disk": get_monitor_data_of_host_disk,
+    "disk_input_output": get_monitor_data_of_host_disk_input_output,
+    "net_bytes_sent": get_monitor_data_of_host_net_bytes_sent,
+    "net_bytes_recv": get_monitor_data_of_host_net_bytes_recv,
+    "net_err_in": get_monitor_data_of_host_net_err_in,
+    "net_err_out": get_monitor_data_of_host_net_err_out,
+}
+
+
+async def top_hosts(tenant_id: int, hosts: List[str], metric: str, score: str, limit: int, start: int, end: int) -> List[Dict]:
+    """
+    Rank hosts by `metric` reduced to a `score` (last, avg or p95) and return the top `limit`.
+    All hosts are queried in batches; a host with several series (a disk per mount) is scored
+    by its highest one.
+    """
+    fetch = functools.partial(query_host_metrics, query=TOP_HOST_METRICS[metric])
+    batches = await query_host_batches(fetch, tenant_id, hosts, start, end)
+    owners, series = [], []
+    for host, labels, points in iter_host_series(batches):
+        owners.append((host, " ".join(labels)))
+        series.append(points)
+    best: Dict[str, tuple] = {}
+    for (host, labels), value in zip(owners, timeseries.score_series(series, score)):
+        if not math.isnan(value) and (host not in best or value > best[host][0]):
+            best[host] = (float(value), labels)
+    top = heapq.nlargest(limit, best.items(), key=lambda item: item[1][0])
+    return [{"rank": rank, "host_name": host, score: value, "series": labels} for rank, (host, (value, labels)) in enumerate(top, 1)]
+
+
+def _disk_series(batches: List[Tuple[List[str], Any]], metric_name: str) -> Dict[tuple, List[Any]]:
+    # (host, labels without the metric name) -> series, the same key for the total and used series of a mount
+    return {(host, tuple(label for label in labels if metric_name not in label)): points for host, labels, points in iter_host_series(batches)}
+
+
+async def forecast_host_disk_usage(tenant_id: int, hosts: List[str], start: int, end: int, method: str = "robust") -> List[Dict]:
+    """
+    Fit a trend to the used space of every mount of the hosts and estimate when the last used
+    space growing at its slope reaches the disk total. Mounts that are not growing have no time
+    to full and are listed last.
+    """
+    total_batches, used_batches = await asyncio.gather(
+        query_host_batches(functools.partial(query_host_metrics, query=HOST_DISK_TOTAL_METRICS), tenant_id, hosts, start, end),
+        query_host_batches(functools.partial(query_host_metrics, query=HOST_DISK_USED_METRICS), tenant_id, hosts, start, end),
+    )
+    totals = _disk_series(total_batches, "serverinfo-disk-total-metric")
+    used = _disk_series(used_batches, "serverinfo-disk-used-metric")
+
+    now = utils.current_millis()
+    rows = []
+    for (host, labels), points in used.items():
+        total = timeseries.last_value(totals.get((host, labels), []))
+        trend = timeseries.fit_trend(points, method)
+        if total is None or trend is None:
+            logger.warning(f"Skipping mount {' '.join(labels)} of {host}: {'no disk total' if total is None else 'not enough used space data'}")
+            continue
+        # the trend only gives the growth rate, usage starts from the last observed value
+        slope, _ = trend
+        used_now = min(timeseries.last_value(points), total)
+        row = {
+            "host_name": host,
+            "mount": " ".join(labels),
+            "used_percent": 100 * used_now / total if total > 0 else math.nan,
+            "growth_per_day_in_gb": slope * 86_400_000 / 1024**3,
+            "days_to_full": math.inf,
+            "full_at": "-",
+        }
+        if slope > 0:
+            full_at = now + (total - used_now) / slope
+            row["days_to_full"] = (full_at - now) / 86_400_000
+            row["full_at"] = utils.from_unix_mill_to_datetime(int(full_at))
+        rows.append(row)
+    rows.sort(key=lambda row: row["days_to_full"])
+    return rows
+
+
+async def get_host_overview(tenant_id: int, hosts: List[str], start: int, end: int) -> Dict[str, Any]:
+    # fetch all host metric families concurrently, a failed family does not hide the others
+    results = await asyncio.gather(
+        *[query_hosts(fetch, tenant_id, hosts, start, end) for fetch in HOST_MONITOR_FAMILIES.values()],
+        return_exceptions=True,
+    )
+    overview = {}
+    for family, result in zip(HOST_MONITOR_FAMILIES.keys(), results):
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+        overview[family] = f"{result}" if isinstance(result, Exception) else result
+    return overview
 
 
 class MiddlewareMonitorInterface:
@@ -117,10 +427,16 @@ class MiddlewareMonitorInterface:
         return list(cls.monitor_metrics.keys())
 
     @classmethod
-    def get_monitor_metrics(cls, monitor_type: str) -> Any:
+    def get_monitor_metrics(cls, monitor_type: str) -> MetricQuery:
         if monitor_type not in cls.monitor_metrics:
             raise ValueError(f"Monitor type {monitor_type} is not supported")
-        return cls.monitor_metrics[monitor_type]
+        return _compile_monitor_metrics(cls, monitor_type)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_monitor_metrics(monitor: Type[MiddlewareMonitorInterface], monitor_type: str) -> MetricQuery:
+    # compiled on first use, the class level specs are never handed out
+    return MetricQuery.compile(monitor.monitor_metrics[monitor_type])
 
 
 class PrometheusMonitor(MiddlewareMonitorInterface):
@@ -891,7 +1207,7 @@ async def get_middleware_monitor_metrics(middleware_instance_name: str) -> List[
     return middleware_monitor.get_monitor_type()
 
 
-async def get_monitor_metrics(middleware_instance_name: str, monitor_type: str) -> Any:
+async def get_monitor_metrics(middleware_instance_name: str, monitor_type: str) -> MetricQuery:
     instance = await apis.get_middleware_instance(middleware_instance_name)
     middleware_name = instance.middleware_name.lower()
     if middleware_name not in MIDDLEWARE_MONITOR_MAP:
@@ -900,13 +1216,227 @@ async def get_monitor_metrics(middleware_instance_name: str, monitor_type: str)
     return middleware_monitor.get_monitor_metrics(monitor_type)
 
 
+async def resolve_node_names(arg: schema.MiddlewareInstanceMonitorDataSchema) -> List[str]:
+    node_names = list(arg.node_names) if arg.node_names else []
+    if arg.node_name and arg.node_name not in node_names:
+        node_names.insert(0, arg.node_name)
+    if len(node_names) == 0:
+        # no node given, use all nodes of the instance
+        id = await apis.get_middleware_instance_id(arg.middleware_instance_name)
+        nodes = await apis.list_middleware_instance_nodes(id)
+        node_names = [node.node_name for node in nodes]
+    return node_names
+
+
 async def get_middleware_monitor_data(arg: schema.MiddlewareInstanceMonitorDataSchema) -> Dict:
-    tenant_id = await apis.get_tenant_id()
+    tenant_id, node_names, query = await asyncio.gather(
+        apis.get_tenant_id(),
+        resolve_node_names(arg),
+        get_monitor_metrics(arg.middleware_instance_name, arg.metric_name),
+    )
     start, end = utils.get_start_end_time(arg.time_interval_in_minutes)
-    d = {
-        "filters": [{"name": "service", "values": [arg.middleware_instance_name]}, {"name": "node_name", "values": [arg.node_name]}],
-        "start": start,
-        "end": end,
-        "metrics": await get_monitor_metrics(arg.middleware_instance_name, arg.metric_name),
-    }
-    return await apis.get_monitor_data(tenant_id, d)
+    result = await query_middleware_nodes(tenant_id, arg.middleware_instance_name, node_names, query, start, end)
+    return format_monitor_data(result, arg)
+
+
+async def query_middleware_nodes(tenant_id: int, instance_name: str, node_names: List[str], query: MetricQuery, start: int, end: int) -> Any:
+    if len(node_names) > 1:
+        # one request for all nodes, with a series per node
+        query = group_metrics_by(query, "node_name")
+    filters = [{"name": "service", "values": [instance_name]}, {"name": "node_name", "values": node_names}]
+    return await get_time_series(tenant_id, filters, query, start, end)
+
+
+async def correlate_middleware_with_hosts(
+    tenant_id: int,
+    instance_name: str,
+    node_hosts: Dict[str, str],
+    query: MetricQuery,
+    families: List[str],
+    start: int,
+    end: int,
+    step: int,
+    max_lag: int,
+) -> List[Dict]:
+    """
+    Correlate every middleware series of each node with the host metric `families` of the host
+    the node runs on. Series are aligned to a grid of `step` ms and correlated at lags of up to
+    `max_lag` steps; a positive best lag means the host metric moves first. Pairs are ranked by
+    the absolute value of their best correlation.
+    """
+    node_names, hosts = list(node_hosts.keys()), sorted(set(node_hosts.values()))
+    middleware_result, *host_results = await asyncio.gather(
+        query_middleware_nodes(tenant_id, instance_name, node_names, query, start, end),
+        *[query_hosts(HOST_MONITOR_FAMILIES[family], tenant_id, hosts, start, end) for family in families],
+    )
+    host_series: Dict[str, List[timeseries.Series]] = {}
+    for family, result in zip(families, host_results):
+        for labels, points in timeseries.iter_series(result):
+            host = series_owner(labels, hosts)
+            if host is not None:
+                host_series.setdefault(host, []).append(timeseries.Series.from_points(points, (family, *labels)))
+
+    rows = []
+    for labels, points in timeseries.iter_series(middleware_result):
+        node = series_owner(labels, node_names)
+        candidates = host_series.get(node_hosts[node], []) if node is not None else []
+        if len(candidates) == 0:
+            continue
+        _, matrix = timeseries.join([timeseries.Series.from_points(points), *candidates], step)
+        if matrix.shape[1] == 0:
+            continue
+        correlations = timeseries.lagged_correlations(matrix[0], matrix[1:], max_lag)
+        for candidate, by_lag in zip(candidates, correlations):
+            if np.isnan(by_lag).all():
+                continue
+            best = int(np.nanargmax(np.abs(by_lag)))
+            rows.append(
+                {
+                    "node_name": node,
+                    "middleware_series": " ".join(labels) or "-",
+                    "host_name": node_hosts[node],
+                    "host_series": " ".join(candidate.labels),
+                    "correlation": float(by_lag[max_lag]),
+                    "best_correlation": float(by_lag[best]),
+                    "best_lag_in_seconds": (best - max_lag) * step // 1000,
+                }
+            )
+    rows.sort(key=lambda row: -abs(row["best_correlation"]))
+    return rows
+
+
+class FleetAnomaly(BaseModel):
+    instance_name: str
+    middleware_name: str
+    kind: Literal["status", "metric"]
+    detail: str
+    score: float
+
+
+class FleetScanReport(BaseModel):
+    scanned_instances: int
+    anomalies: List[FleetAnomaly]
+    errors: List[str]
+
+
+# whole words in a status value that mark an instance as unhealthy
+UNHEALTHY_STATUS_WORDS = frozenset(
+    ("error", "errors", "fail", "failed", "failing", "failure", "down", "abnormal", "unhealthy", "crash", "crashed", "crashing", "exception", "lost")
+)
+
+# words of a status value: runs of letters, camel case split ("CrashLoopBackOff" -> crash, loop, back, off)
+_STATUS_WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+
+# status values of instances stopped or started on purpose, never reported
+LIFECYCLE_STATUS_VALUES = ("stopped", "stopping", "starting", "shutdown", "shut down")
+
+
+def unhealthy_status_fields(status: Any, path: str = "") -> List[str]:
+    """
+    Return the "key=value" fields of a status response whose value holds one of UNHEALTHY_STATUS_WORDS
+    as a whole word and is not one of LIFECYCLE_STATUS_VALUES.
+    """
+    if isinstance(status, dict):
+        return [field for key, value in status.items() for field in unhealthy_status_fields(value, f"{path}.{key}" if path else key)]
+    if isinstance(status, list):
+        return [field for value in status for field in unhealthy_status_fields(value, path)]
+    if isinstance(status, str) and status.strip().lower() not in LIFECYCLE_STATUS_VALUES:
+        if any(word.lower() in UNHEALTHY_STATUS_WORDS for word in _STATUS_WORD.findall(status)):
+            return [f"{path}={status}"]
+    return []
+
+
+async def _scan_status(instance: apis.MiddlewareInstance) -> List[FleetAnomaly]:
+    status = await apis.get_middleware_instance_status(instance.instance_id)
+    fields = unhealthy_status_fields(status)
+    if len(fields) == 0:
+        return []
+    return [
+        FleetAnomaly(
+            instance_name=instance.name,
+            middleware_name=instance.middleware_name,
+            kind="status",
+            detail=", ".join(fields),
+            score=float(len(fields)),
+        )
+    ]
+
+
+async def _scan_metrics(
+    tenant_id: int,
+    monitor: Type[MiddlewareMonitorInterface],
+    monitor_type: str,
+    instances: List[apis.MiddlewareInstance],
+    start: int,
+    end: int,
+) -> List[FleetAnomaly]:
+    # one query for the whole batch, with a series per instance
+    query = monitor.get_monitor_metrics(monitor_type)
+    if len(instances) > 1:
+        query = group_metrics_by(query, "service")
+    filters = [{"name": "service", "values": [instance.name for instance in instances]}]
+    result = await get_time_series(tenant_id, filters, query, start, end)
+
+    by_name = {instance.name: instance for instance in instances}
+    anomalies = []
+    for labels, points in timeseries.iter_series(result):
+        score = timeseries.robust_zscore(points)
+        owner = series_owner(labels, list(by_name.keys()))
+        if score is None or abs(score) < FLEET_SCAN_SCORE_THRESHOLD or owner is None:
+            continue
+        instance = by_name[owner]
+        anomalies.append(
+            FleetAnomaly(
+                instance_name=instance.name,
+                middleware_name=instance.middleware_name,
+                kind="metric",
+                detail=f"{monitor_type} {' '.join(labels)}: last value is {score:+.1f} robust deviations from the median",
+                score=abs(score),
+            )
+        )
+    return anomalies
+
+
+async def scan_middleware_fleet(
+    tenant_id: int,
+    instances: List[apis.MiddlewareInstance],
+    start: int,
+    end: int,
+    monitor_types: Optional[List[str]] = None,
+    concurrency: int = FLEET_SCAN_CONCURRENCY,
+) -> FleetScanReport:
+    """
+    Check the status of every instance and the monitor groups of MIDDLEWARE_MONITOR_MAP (all of
+    them, or only `monitor_types`) for every supported instance. Metric queries are batched per
+    middleware type, FLEET_SCAN_SERVICE_BATCH_SIZE instances a request. All calls run with at
+    most `concurrency` in flight; a failed call is reported in `errors` and does not stop the scan.
+    Status problems rank first, then metrics by how far their last value is from the median.
+    """
+    errors: List[str] = []
+
+    async def collect(job: Awaitable[List[FleetAnomaly]], description: str) -> List[FleetAnomaly]:
+        try:
+            return await job
+        except Exception as e:
+            errors.append(f"{description}: {e}")
+            return []
+
+    jobs = [collect(_scan_status(instance), f"status of {instance.name}") for instance in instances]
+
+    by_middleware: Dict[str, List[apis.MiddlewareInstance]] = {}
+    for instance in instances:
+        by_middleware.setdefault(instance.middleware_name.lower(), []).append(instance)
+    for middleware_name, members in by_middleware.items():
+        monitor = MIDDLEWARE_MONITOR_MAP.get(middleware_name)
+        if monitor is None:
+            continue
+        for monitor_type in monitor.get_monitor_type():
+            if monitor_types and monitor_type not in monitor_types:
+                continue
+            for batch in utils.chunks(members, FLEET_SCAN_SERVICE_BATCH_SIZE):
+                jobs.append(collect(_scan_metrics(tenant_id, monitor, monitor_type, batch, start, end), f"{monitor_type} of {middleware_name}"))
+
+    results = await utils.gather_with_concurrency(concurrency, jobs)
+    anomalies = [anomaly for result in results for anomaly in result]
+    anomalies.sort(key=lambda anomaly: (anomaly.kind != "status", -anomaly.score))
+    return FleetScanReport(scanned_instances=len(instances), anomalies=anomalies, errors=errors)
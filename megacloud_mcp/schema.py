@@ -43,13 +43,71 @@ class MiddlewareLogSchema(BaseModel):
     log_type: str
     time_interval_in_minutes: int = 30
     current_page: int = 1
+    all_pages: bool = False
+    max_lines: int = 1000
+    max_bytes: int = 256 * 1024
+    keyword: Optional[str] = None
+    keywords: Optional[list[str]] = None
+    keyword_mode: Literal["and", "or"] = "or"
+    host_ipv4: Optional[str] = None
+    host_name: Optional[str] = None
+    node_name: Optional[str] = None
+    follow: bool = False
+    follow_timeout_in_seconds: int = 0
+    poll_interval_in_seconds: int = 5
+    output: Literal["raw", "templates"] = "raw"
+    max_templates: int = 50
+
+
+class MonitorOutputSchema(BaseModel):
+    output: Literal["raw", "summary", "anomalies"] = "raw"
+    transform: Literal["none", "rate", "derivative"] = "none"
+    resample_step_in_seconds: Optional[int] = None
+    max_points: Optional[int] = None
+    downsample_method: Literal["lttb", "minmax"] = "lttb"
+    anomaly_method: Literal["zscore", "mad", "seasonal"] = "mad"
+    anomaly_threshold: float = 3.5
+    anomaly_window: int = 30
+    season_in_minutes: int = 24 * 60
+
+
+class HostNameTimeIntervalSchema(MonitorOutputSchema):
+    host_name: Optional[str] = None
+    host_names: Optional[list[str]] = None
+    all_hosts: bool = False
+    time_interval_in_minutes: int = 60
 
 
-class HostNameTimeIntervalSchema(BaseModel):
-    host_name: str
+class TopHostsSchema(BaseModel):
+    metric: Literal[
+        "cpu_user",
+        "cpu_system",
+        "cpu_iowait",
+        "memory_used",
+        "load1",
+        "load5",
+        "load15",
+        "disk_used",
+        "disk_read_bytes",
+        "disk_write_bytes",
+        "net_bytes_sent",
+        "net_bytes_recv",
+        "net_err_in",
+        "net_err_out",
+    ]
+    score: Literal["last", "avg", "p95"] = "p95"
+    limit: int = 10
+    host_names: Optional[list[str]] = None
     time_interval_in_minutes: int = 60
 
 
+class DiskForecastSchema(BaseModel):
+    host_names: Optional[list[str]] = None
+    method: Literal["linear", "robust"] = "robust"
+    time_interval_in_minutes: int = 7 * 24 * 60
+    limit: int = 20
+
+
 class CreateAlertRuleSchema(BaseModel):
     name: str
     description: str
@@ -68,8 +126,29 @@ class MiddlewareInstanceAlertRuleNameSchema(BaseModel):
     alert_rule_name: str
 
 
-class MiddlewareInstanceMonitorDataSchema(BaseModel):
+class MiddlewareInstanceMonitorDataSchema(MonitorOutputSchema):
+    middleware_instance_name: str
+    node_name: Optional[str] = None
+    node_names: Optional[list[str]] = None
+    metric_name: str
+    time_interval_in_minutes: int = 60
+
+
+class MiddlewareFleetScanSchema(BaseModel):
+    middleware_names: Optional[list[str]] = None
+    monitor_types: Optional[list[str]] = None
+    time_interval_in_minutes: int = 30
+    concurrency: Optional[int] = None
+    limit: int = 20
+
+
+class MiddlewareHostCorrelationSchema(BaseModel):
     middleware_instance_name: str
-    node_name: str
     metric_name: str
+    host_metrics: Optional[
+        list[Literal["cpu", "memory", "load", "disk", "disk_input_output", "net_bytes_sent", "net_bytes_recv", "net_err_in", "net_err_out"]]
+    ] = None
     time_interval_in_minutes: int = 60
+    step_in_seconds: int = 60
+    max_lag_steps: int = 5
+    limit: int = 20
@@ -1,17 +1,20 @@
 import asyncio
+from contextlib import asynccontextmanager
 from enum import Enum
-from typing import List
+from typing import AsyncIterator, List, Optional
 
 from mcp.server import Server
 from mcp.types import TextContent, Tool
 from mcp.server.stdio import stdio_server
 
 from megacloud_mcp import apis
+from megacloud_mcp import client
 from megacloud_mcp import utils
 from megacloud_mcp import schema
 from megacloud_mcp import middleware
 from megacloud_mcp.log import logger
 from megacloud_mcp import monitor
+from megacloud_mcp.settings import HTTP_WARMUP_ENABLED
 
 
 class MegaCloudTools(str, Enum):
@@ -40,6 +43,9 @@ class MegaCloudTools(str, Enum):
     ListHostNetBytesRecvMonitorData = "list_host_net_bytes_recv_monitor_data"
     ListHostMemoryMonitorData = "list_host_memory_monitor_data"
     ListHostCpuMonitorData = "list_host_cpu_monitor_data"
+    GetHostOverview = "get_host_overview"
+    TopHosts = "top_hosts"
+    ForecastHostDiskUsage = "forecast_host_disk_usage"
     ListMiddlewareAlertMetrics = "list_middleware_alert_metrics"
     CreateMiddlewareAlertRule = "create_middleware_alert_rule"
     StartMiddlewareAlertRule = "start_middleware_alert_rule"
@@ -47,6 +53,8 @@ class MegaCloudTools(str, Enum):
     DeleteMiddlewareAlertRule = "delete_middleware_alert_rule"
     ListMiddlewareInstanceMonitorMetricTypes = "list_middleware_instance_monitor_metric_types"
     ListMiddlewareInstanceMonitorData = "list_middleware_instance_monitor_data"
+    ScanMiddlewareFleet = "scan_middleware_fleet"
+    CorrelateMiddlewareWithHosts = "correlate_middleware_with_hosts"
 
     # redis
     CreateSingleRedisMiddleware = "create_single_redis_middleware"
@@ -54,14 +62,49 @@ class MegaCloudTools(str, Enum):
     AddRedisNodes = "add_redis_nodes"
 
 
+def progress_reporter(server: Server) -> Optional[middleware.ProgressFunc]:
+    # reports progress of the current tool call, if the client asked for it with a progress token
+    ctx = server.request_context
+    token = ctx.meta.progressToken if ctx.meta else None
+    if token is None:
+        return None
+
+    async def report(progress: float, total: Optional[float] = None):
+        await ctx.session.send_progress_notification(token, progress, total)
+
+    return report
+
+
 async def change_middleware_state(arguments: dict, operation: int) -> List[TextContent]:
     arg = schema.MiddlewareNameSchema(**arguments)
     resp = await middleware.change_middleware_state(arg.middleware_instance_name, operation)
     return utils.to_textcontent(resp)
 
 
+async def prefetch():
+    if HTTP_WARMUP_ENABLED:
+        await client.warmup_async_client()
+    try:
+        # prefetch tenant and authorizations used by every monitor tool
+        await apis.get_authorizations()
+    except Exception as e:
+        logger.warning(f"Failed to prefetch authorizations: {e}")
+
+
+@asynccontextmanager
+async def lifespan(server: Server) -> AsyncIterator[None]:
+    # in the background, the session only starts once the lifespan has entered
+    task = asyncio.create_task(prefetch())
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await client.close_async_client()
+
+
 async def serve():
-    server = Server("megacloud")
+    server = Server("megacloud", lifespan=lifespan)
 
     @server.list_tools()
     async def list_tools() -> list[Tool]:
@@ -143,54 +186,69 @@ async def serve():
             ),
             Tool(
                 name=MegaCloudTools.ListMiddlewareInstanceLogs,
-                description="List logs of a middleware instance.",
+                description="List logs of a middleware instance. One page is returned by default; set all_pages to get the logs of all pages in time order, up to max_lines lines and max_bytes bytes. Filter by keyword, host_ipv4, host_name or node_name on the server; several keywords are combined with keyword_mode and return the logs of all pages. Set follow to only get the lines that arrived since the previous follow call, polling for up to follow_timeout_in_seconds. Set output to templates to collapse the lines of all pages, up to max_lines, into templates with counts, first and last times and exemplars.",
                 inputSchema=schema.MiddlewareLogSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostLoadMonitorData,
-                description="List load monitor data of given host",
+                description="List load monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostNetErrOutMonitorData,
-                description="List net err out monitor data of given host",
+                description="List net err out monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostNetErrInMonitorData,
-                description="List net err in monitor data of given host",
+                description="List net err in monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostDiskMonitorData,
-                description="List disk monitor data of given host",
+                description="List disk monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostDiskInputOutputMonitorData,
-                description="List disk input output monitor data of given host",
+                description="List disk input output monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostNetBytesSentMonitorData,
-                description="List net bytes sent monitor data of given host",
+                description="List net bytes sent monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostNetBytesRecvMonitorData,
-                description="List net bytes recv monitor data of given host",
+                description="List net bytes recv monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostMemoryMonitorData,
-                description="List memory monitor data of given host",
+                description="List memory monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
             Tool(
                 name=MegaCloudTools.ListHostCpuMonitorData,
-                description="List cpu monitor data of given host",
+                description="List cpu monitor data of given host, several hosts or all available hosts",
                 inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
             ),
+            Tool(
+                name=MegaCloudTools.GetHostOverview,
+                description="Get an overview of given host, several hosts or all available hosts with cpu, memory, load, disk, disk io and network monitor data in one call",
+                inputSchema=schema.HostNameTimeIntervalSchema.model_json_schema(),
+            ),
+            Tool(
+                name=MegaCloudTools.TopHosts,
+                description="Rank all available hosts (or the given host_names) by a metric like cpu, memory, load, disk or network usage and return the top hosts with their values. score reduces the series of each host to its last value, average or 95th percentile.",
+                inputSchema=schema.TopHostsSchema.model_json_schema(),
+            ),
+            Tool(
+                name=MegaCloudTools.ForecastHostDiskUsage,
+                description="Forecast when the disks of all available hosts (or the given host_names) become full, from the trend of the used space of each mount over the time interval (7 days by default). Mounts that fill up first are listed first.",
+                inputSchema=schema.DiskForecastSchema.model_json_schema(),
+            ),
             Tool(
                 name=MegaCloudTools.ListMiddlewareAlertMetrics,
                 description="List all alert metrics of a middleware instance that can be used to create alert rules.",
@@ -223,9 +281,19 @@ async def serve():
             ),
             Tool(
                 name=MegaCloudTools.ListMiddlewareInstanceMonitorData,
-                description="List monitor data of a middleware instance.",
+                description="List monitor data of a middleware instance. Without node_name or node_names, data of all nodes of the instance is returned. Set output to anomalies to only get the anomalous intervals of every node with their severity.",
                 inputSchema=schema.MiddlewareInstanceMonitorDataSchema.model_json_schema(),
             ),
+            Tool(
+                name=MegaCloudTools.ScanMiddlewareFleet,
+                description="Scan all middleware instances (or only those of given middleware types) for unhealthy status and anomalous monitor metrics, and return the anomalies ranked by severity. Limit the checked metric groups with monitor_types to speed up the scan.",
+                inputSchema=schema.MiddlewareFleetScanSchema.model_json_schema(),
+            ),
+            Tool(
+                name=MegaCloudTools.CorrelateMiddlewareWithHosts,
+                description="Correlate a monitor metric of a middleware instance with the cpu, memory, load, disk and network metrics of the hosts its nodes run on. Returns host metrics ranked by correlation, including the lag at which they correlate best (positive: the host metric moves first).",
+                inputSchema=schema.MiddlewareHostCorrelationSchema.model_json_schema(),
+            ),
             # redis
             Tool(
                 name=MegaCloudTools.CreateSingleRedisMiddleware,
@@ -319,7 +387,7 @@ async def serve():
 
             case MegaCloudTools.ListMiddlewareInstanceLogs:
                 arg = schema.MiddlewareLogSchema(**arguments)
-                resp = await middleware.get_middleware_instance_logs(arg)
+                resp = await middleware.get_middleware_instance_logs(arg, progress_reporter(server))
                 return utils.to_textcontent(resp)
 
             case MegaCloudTools.ListHostLoadMonitorData:
@@ -367,6 +435,21 @@ async def serve():
                 resp = await middleware.get_monitor_data_of_host_cpu(arg)
                 return utils.to_textcontent(resp)
 
+            case MegaCloudTools.GetHostOverview:
+                arg = schema.HostNameTimeIntervalSchema(**arguments)
+                resp = await middleware.get_host_overview(arg)
+                return utils.to_textcontent(resp)
+
+            case MegaCloudTools.TopHosts:
+                arg = schema.TopHostsSchema(**arguments)
+                resp = await middleware.top_hosts(arg)
+                return utils.to_textcontent(resp)
+
+            case MegaCloudTools.ForecastHostDiskUsage:
+                arg = schema.DiskForecastSchema(**arguments)
+                resp = await middleware.forecast_host_disk_usage(arg)
+                return utils.to_textcontent(resp)
+
             case MegaCloudTools.ListMiddlewareAlertMetrics:
                 arg = schema.MiddlewareTypeNameSchema(**arguments)
                 resp = await apis.get_middleware_alert_metrics(arg.middleware_type_name)
@@ -402,6 +485,16 @@ async def serve():
                 resp = await monitor.get_middleware_monitor_data(arg)
                 return utils.to_textcontent(resp)
 
+            case MegaCloudTools.ScanMiddlewareFleet:
+                arg = schema.MiddlewareFleetScanSchema(**arguments)
+                resp = await middleware.scan_middleware_fleet(arg)
+                return utils.to_textcontent(resp)
+
+            case MegaCloudTools.CorrelateMiddlewareWithHosts:
+                arg = schema.MiddlewareHostCorrelationSchema(**arguments)
+                resp = await middleware.correlate_middleware_with_hosts(arg)
+                return utils.to_textcontent(resp)
+
             # redis
             case MegaCloudTools.CreateSingleRedisMiddleware:
                 arg = schema.CreateSingleRedisMiddlewareSchema(**arguments)
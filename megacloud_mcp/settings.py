@@ -1,2 +1,45 @@
+import os
+
 ENV_AUTHTOKEN = "MEGACLOUD_AUTHTOKEN"
 BACKEND_URL = "https://cloud.megaease.cn"
+
+# upstream request executor
+RETRY_MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY_IN_SECONDS = 0.2
+RETRY_MAX_DELAY_IN_SECONDS = 2.0
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT_IN_SECONDS = 30.0
+
+# http connection pool, see client.py
+HTTP_MAX_CONNECTIONS = int(os.getenv("MEGACLOUD_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("MEGACLOUD_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_IN_SECONDS = float(os.getenv("MEGACLOUD_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT_IN_SECONDS = float(os.getenv("MEGACLOUD_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT_IN_SECONDS = float(os.getenv("MEGACLOUD_HTTP_READ_TIMEOUT", "30"))
+HTTP2_ENABLED = os.getenv("MEGACLOUD_HTTP2", "false").lower() in ("1", "true", "yes")
+HTTP_WARMUP_ENABLED = os.getenv("MEGACLOUD_HTTP_WARMUP", "false").lower() in ("1", "true", "yes")
+
+# caches
+MIDDLEWARE_INSTANCE_INDEX_TTL_IN_SECONDS = 60.0
+MIDDLEWARE_TYPE_TTL_IN_SECONDS = 3600.0
+
+# pagination
+MIDDLEWARE_INSTANCE_PAGE_SIZE = 100
+PAGE_FETCH_CONCURRENCY = 4
+MIDDLEWARE_TYPE_PAGE_SIZE = 50
+LOG_PAGE_SIZE = 50
+LOG_BULK_PAGE_SIZE = 200
+LOG_CURSOR_MAX_ENTRIES = 256
+
+# monitor queries
+HOST_FILTER_MAX_SIZE = 20
+MONITOR_QUERY_CONCURRENCY = 8
+TIME_SERIES_CACHE_STEP_IN_SECONDS = 60
+TIME_SERIES_CACHE_MAX_ENTRIES = 256
+TIME_SERIES_CHUNK_IN_MINUTES = 360
+
+# fleet scan
+FLEET_SCAN_CONCURRENCY = 16
+FLEET_SCAN_SERVICE_BATCH_SIZE = 20
+FLEET_SCAN_SCORE_THRESHOLD = 3.5
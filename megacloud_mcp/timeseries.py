@@ -0,0 +1,600 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+# keys used for the timestamp and value of a point given as an object
+TIMESTAMP_KEYS = ("timestamp", "time", "ts", "t")
+VALUE_KEYS = ("value", "val", "v", "y")
+
+
+def _point_keys(point: Any) -> Optional[Tuple[Any, Any]]:
+    """
+    Return how to read (timestamp, value) from a point: indexes 0 and 1 for a
+    [timestamp, value] pair, or the matching keys for a {"timestamp": ..., "value": ...} object.
+    """
+    if isinstance(point, (list, tuple)) and len(point) >= 2 and isinstance(point[0], (int, float)) and not isinstance(point[0], bool):
+        return 0, 1
+    if isinstance(point, dict):
+        ts_key = next((key for key in TIMESTAMP_KEYS if key in point), None)
+        value_key = next((key for key in VALUE_KEYS if key in point), None)
+        if ts_key is not None and value_key is not None:
+            return ts_key, value_key
+    return None
+
+
+def is_series(points: Any) -> bool:
+    if not isinstance(points, list) or len(points) == 0:
+        return False
+    keys = _point_keys(points[0])
+    return keys is not None and _point_keys(points[-1]) == keys
+
+
+def timestamps(points: List[Any]) -> np.ndarray:
+    """
+    Timestamps of a series in unix milliseconds, timestamps given in seconds are converted.
+    """
+    ts_key, _ = _point_keys(points[0])  # type: ignore[misc]
+    ts = np.fromiter((point[ts_key] for point in points), dtype=np.float64, count=len(points))
+    if len(ts) > 0 and ts[-1] < 1e11:
+        ts *= 1000
+    return ts
+
+
+def to_arrays(points: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a series to (timestamps, values) float arrays, missing values become NaN.
+    """
+    _, value_key = _point_keys(points[0])  # type: ignore[misc]
+    ts = timestamps(points)
+    values = np.array([np.nan if point[value_key] is None else point[value_key] for point in points], dtype=np.float64)
+    return ts, values
+
+
+# keys that only hold series and say nothing about them
+_CONTAINER_KEYS = {"data", "values", "points", "datapoints", "series", "result", "results", "list"}
+
+
+def _labels_of(data: dict) -> Tuple[str, ...]:
+    # scalar fields next to a series (metric name, group value, tags) describe it
+    labels = []
+    for key, value in data.items():
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            labels.append(f"{key}={value}")
+        elif isinstance(value, dict):
+            labels.extend(f"{k}={v}" for k, v in value.items() if isinstance(v, (str, int, float)) and not isinstance(v, bool))
+    return tuple(labels)
+
+
+def iter_series(data: Any, labels: Tuple[str, ...] = ()):
+    """
+    Walk a monitor response and yield (labels, points) for every series found in it, where
+    labels are the scalar fields of the enclosing objects.
+    """
+    if is_series(data):
+        yield labels, data
+    elif isinstance(data, dict):
+        labels = labels + _labels_of(data)
+        for key, value in data.items():
+            if isinstance(value, (dict, list)):
+                yield from iter_series(value, labels if key in _CONTAINER_KEYS else labels + (key,))
+    elif isinstance(data, list):
+        for value in data:
+            yield from iter_series(value, labels)
+
+
+def map_labelled_series(data: Any, func, labels: Tuple[str, ...] = ()) -> Any:
+    """
+    Return a copy of a monitor response with every series replaced by `func(labels, points)`,
+    labels being the same as the ones given by iter_series.
+    """
+    if is_series(data):
+        return func(labels, data)
+    if isinstance(data, dict):
+        labels = labels + _labels_of(data)
+        return {
+            key: map_labelled_series(value, func, labels if key in _CONTAINER_KEYS else labels + (key,)) if isinstance(value, (dict, list)) else value
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [map_labelled_series(value, func, labels) for value in data]
+    return data
+
+
+def map_series(data: Any, func) -> Any:
+    """
+    Return a copy of a monitor response with every series replaced by `func(points)`.
+    """
+    return map_labelled_series(data, lambda labels, points: func(points))
+
+
+def slice_series(points: List[Any], start: float, end: float) -> List[Any]:
+    """
+    Points of a series with start <= timestamp <= end.
+    """
+    ts = timestamps(points)
+    return [points[i] for i in np.flatnonzero((ts >= start) & (ts <= end))]
+
+
+def concat_series(parts: List[List[Any]]) -> List[Any]:
+    """
+    Concatenate consecutive parts of a series in time order. A timestamp present in several
+    parts (a chunk boundary) is kept once, from the later part.
+    """
+    points = [point for part in parts for point in part]
+    if len(points) == 0:
+        return points
+    ts = timestamps(points)
+    order = np.argsort(ts, kind="stable")
+    sorted_ts = ts[order]
+    keep = np.r_[sorted_ts[1:] != sorted_ts[:-1], True]
+    return [points[i] for i in order[keep]]
+
+
+def _merge_shapes(a: Any, b: Any) -> Any:
+    """
+    Union of two monitor responses: objects are merged key by key and the objects of lists are
+    matched by their labels, the ones only in `b` are appended. Series are taken from `a`.
+    """
+    if is_series(a) or is_series(b):
+        return a if is_series(a) else b
+    if isinstance(a, dict) and isinstance(b, dict):
+        merged = dict(a)
+        for key, value in b.items():
+            merged[key] = _merge_shapes(a[key], value) if key in a else value
+        return merged
+    if isinstance(a, list) and isinstance(b, list):
+        merged = list(a)
+        by_labels = {_labels_of(value): i for i, value in enumerate(a) if isinstance(value, dict)}
+        for value in b:
+            i = by_labels.get(_labels_of(value)) if isinstance(value, dict) else None
+            if i is not None:
+                merged[i] = _merge_shapes(merged[i], value)
+            elif isinstance(value, dict):
+                by_labels[_labels_of(value)] = len(merged)
+                merged.append(value)
+        return merged
+    return a
+
+
+def concat_results(results: List[Any]) -> Any:
+    """
+    Merge monitor responses of consecutive time ranges into one. The responses are merged into
+    one holding the series of all of them, each series is filled with the matching series of
+    all responses.
+    """
+    parts: Dict[Tuple[str, ...], List[List[Any]]] = {}
+    shape = None
+    for i, result in enumerate(results):
+        for labels, points in iter_series(result):
+            parts.setdefault(labels, []).append(points)
+        shape = result if i == 0 else _merge_shapes(shape, result)
+    return map_labelled_series(shape, lambda labels, points: concat_series(parts.get(labels, [points])))
+
+
+def median_step(points: List[Any]) -> Optional[float]:
+    if len(points) < 2:
+        return None
+    return float(np.median(np.diff(timestamps(points))))
+
+
+def last_value(points: List[Any]) -> Optional[float]:
+    if len(points) == 0:
+        return None
+    _, values = to_arrays(points)
+    valid = values[~np.isnan(values)]
+    return float(valid[-1]) if len(valid) > 0 else None
+
+
+def fit_trend(points: List[Any], method: str = "linear", max_points: int = 256) -> Optional[Tuple[float, float]]:
+    """
+    Fit value = slope * timestamp + intercept, timestamps in unix milliseconds. "linear" is a
+    least squares fit, "robust" the Theil-Sen estimator: the median of the slopes between all
+    pairs of points, computed on at most `max_points` evenly spaced points.
+    """
+    ts, values = to_arrays(points)
+    valid = ~np.isnan(values)
+    ts, values = ts[valid], values[valid]
+    if len(values) < 2 or ts[-1] == ts[0]:
+        return None
+    # fit around the first timestamp, unix milliseconds are too large for a well conditioned fit
+    x = ts - ts[0]
+    if method == "robust":
+        if len(x) > max_points:
+            picked = np.linspace(0, len(x) - 1, max_points).astype(np.int64)
+            x, values = x[picked], values[picked]
+        i, j = np.triu_indices(len(x), k=1)
+        dx = x[j] - x[i]
+        slopes = (values[j] - values[i])[dx > 0] / dx[dx > 0]
+        slope = float(np.median(slopes))
+        intercept = float(np.median(values - slope * x))
+    else:
+        slope, intercept = (float(v) for v in np.polyfit(x, values, 1))
+    return slope, intercept - slope * ts[0]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick `n_out` indices that preserve the visual shape of the series.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 buckets between the first and last point, which are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i == n_out - 3:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        else:
+            next_hi = edges[i + 2]
+            avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Split the series into n_out / 2 buckets and keep the min and max of each, plus the endpoints.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    n_buckets = (n_out - 2) // 2
+    bucket = np.arange(n) * n_buckets // n
+    # sort by (bucket, value): the first row of a bucket is its min, the last its max
+    order = np.lexsort((y, bucket))
+    starts = np.flatnonzero(np.r_[True, np.diff(bucket[order]) != 0])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate(([0, n - 1], order[starts], order[ends])))
+
+
+def downsample(points: List[Any], max_points: int, method: str = "lttb") -> List[Any]:
+    """
+    Reduce a series to at most `max_points` of its original points. Points without a value are dropped.
+    """
+    # both endpoints plus a min and a max bucket at least
+    max_points = max(max_points, 4)
+    if len(points) <= max_points:
+        return points
+    ts, values = to_arrays(points)
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) <= max_points:
+        return [points[i] for i in valid]
+    if method == "minmax":
+        picked = minmax_indices(values[valid], max_points)
+    else:
+        picked = lttb_indices(ts[valid], values[valid], max_points)
+    return [points[i] for i in valid[picked]]
+
+
+def downsample_result(data: Any, max_points: int, method: str = "lttb") -> Any:
+    return map_series(data, lambda points: downsample(points, max_points, method))
+
+
+def summarize(points: List[Any]) -> dict:
+    """
+    Summary statistics of a series. The slope is the least squares trend per hour.
+    """
+    ts, values = to_arrays(points)
+    valid = ~np.isnan(values)
+    ts, values = ts[valid], values[valid]
+    if len(values) == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    slope = 0.0
+    if len(values) > 1 and ts[-1] > ts[0]:
+        hours = (ts - ts[0]) / 3_600_000
+        slope = float(np.polyfit(hours, values, 1)[0])
+    return {
+        "count": int(len(values)),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "last": float(values[-1]),
+        "slope_per_hour": slope,
+    }
+
+
+def summarize_result(data: Any) -> List[dict]:
+    return [{"series": " ".join(labels) or "-", **summarize(points)} for labels, points in iter_series(data)]
+
+
+def robust_zscore(points: List[Any], min_points: int = 5) -> Optional[float]:
+    """
+    How far the last value of a series is from its median, in robust standard deviations
+    (MAD * 1.4826, falling back to the mean absolute deviation when more than half the values
+    are equal). None for series with less than `min_points` values.
+    """
+    _, values = to_arrays(points)
+    values = values[~np.isnan(values)]
+    if len(values) < min_points:
+        return None
+    median = np.median(values)
+    deviations = np.abs(values - median)
+    scale = 1.4826 * np.median(deviations)
+    if scale == 0:
+        scale = 1.2533 * deviations.mean()
+    if scale == 0:
+        return 0.0
+    return float((values[-1] - median) / scale)
+
+
+def score_series(series: List[List[Any]], method: str = "p95") -> np.ndarray:
+    """
+    Reduce each series to one score: its "last" value, "avg" or "p95". The series are
+    stacked into a NaN padded matrix and reduced row-wise; a series without values scores NaN.
+    """
+    scores = np.full(len(series), np.nan)
+    if len(series) == 0:
+        return scores
+    matrix = np.full((len(series), max(len(points) for points in series)), np.nan)
+    for i, points in enumerate(series):
+        if len(points) > 0:
+            matrix[i, : len(points)] = to_arrays(points)[1]
+    valid = ~np.isnan(matrix)
+    rows = valid.any(axis=1)
+    if method == "avg":
+        scores[rows] = np.nanmean(matrix[rows], axis=1)
+    elif method == "p95":
+        scores[rows] = np.nanpercentile(matrix[rows], 95, axis=1)
+    else:
+        last = matrix.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+        scores[rows] = matrix[rows, last[rows]]
+    return scores
+
+
+def _robust_scale(values: np.ndarray) -> float:
+    # MAD as a standard deviation estimate, the mean absolute deviation when the MAD is 0
+    deviations = np.abs(values - np.median(values))
+    scale = 1.4826 * np.median(deviations)
+    return float(scale if scale > 0 else 1.2533 * deviations.mean())
+
+
+def _rolling_scores(values: np.ndarray, window: int, method: str) -> np.ndarray:
+    """
+    Score every point against the `window` points before it: (value - mean) / std for
+    "zscore", (value - median) / (1.4826 * MAD) for "mad". The first `window` points score NaN.
+    """
+    scores = np.full(len(values), np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(values[:-1], window)
+    if method == "zscore":
+        center, scale = windows.mean(axis=1), windows.std(axis=1)
+    else:
+        center = np.median(windows, axis=1)
+        scale = 1.4826 * np.median(np.abs(windows - center[:, None]), axis=1)
+    # a flat window has no spread of its own, measure against the spread of the whole series
+    scale[scale == 0] = _robust_scale(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores[window:] = np.where(scale > 0, (values[window:] - center) / scale, 0.0)
+    return scores
+
+
+def _seasonal_scores(ts: np.ndarray, values: np.ndarray, season: float) -> Optional[np.ndarray]:
+    """
+    Score every point by how much its change from the same time one season earlier deviates
+    from the usual change. None when the series is shorter than a season.
+    """
+    has_baseline = ts - season >= ts[0]
+    if has_baseline.sum() < 5:
+        return None
+    residuals = np.full(len(values), np.nan)
+    residuals[has_baseline] = values[has_baseline] - np.interp(ts[has_baseline] - season, ts, values)
+    valid = residuals[has_baseline]
+    scale = _robust_scale(valid)
+    if scale == 0:
+        return np.where(has_baseline, 0.0, np.nan)
+    return (residuals - np.median(valid)) / scale
+
+
+def anomaly_intervals(
+    points: List[Any],
+    method: str = "mad",
+    threshold: float = 3.5,
+    window: int = 30,
+    season: float = 86_400_000,
+) -> List[dict]:
+    """
+    Flag the points whose score (see _rolling_scores and _seasonal_scores) is at least
+    `threshold` in absolute value and merge consecutive flagged points into intervals. The
+    seasonal method falls back to "mad" when the series does not cover a full `season` (ms).
+    Severity is "critical" from twice the threshold, "major" from 1.5 times, "minor" below.
+    """
+    ts, values = to_arrays(points)
+    valid = ~np.isnan(values)
+    ts, values = ts[valid], values[valid]
+    window = min(window, len(values) - 1)
+    if window < 3:
+        return []
+    scores = _seasonal_scores(ts, values, season) if method == "seasonal" else None
+    if scores is None:
+        scores = _rolling_scores(values, window, "zscore" if method == "zscore" else "mad")
+
+    flagged = np.abs(np.nan_to_num(scores)) >= threshold
+    edges = np.diff(np.r_[0, flagged.astype(np.int8), 0])
+    intervals = []
+    for lo, hi in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        peak = lo + int(np.abs(scores[lo:hi]).argmax())
+        score = abs(float(scores[peak]))
+        intervals.append(
+            {
+                "start": int(ts[lo]),
+                "end": int(ts[hi - 1]),
+                "points": int(hi - lo),
+                "peak_value": float(values[peak]),
+                "score": score,
+                "direction": "up" if scores[peak] > 0 else "down",
+                "severity": "critical" if score >= 2 * threshold else "major" if score >= 1.5 * threshold else "minor",
+            }
+        )
+    return intervals
+
+
+def anomalies_result(data: Any, method: str = "mad", threshold: float = 3.5, window: int = 30, season: float = 86_400_000) -> List[dict]:
+    """
+    Anomalous intervals of all series of a monitor response, the most severe first.
+    """
+    rows = [
+        {"series": " ".join(labels) or "-", **interval}
+        for labels, points in iter_series(data)
+        for interval in anomaly_intervals(points, method, threshold, window, season)
+    ]
+    rows.sort(key=lambda row: -row["score"])
+    return rows
+
+
+class Series:
+    """
+    A series held as two float64 arrays: timestamps in unix milliseconds, sorted and unique,
+    and values with NaN for missing ones. Operations return new series.
+    """
+
+    __slots__ = ("ts", "values", "labels")
+
+    def __init__(self, ts: np.ndarray, values: np.ndarray, labels: Tuple[str, ...] = ()):
+        self.ts = np.asarray(ts, dtype=np.float64)
+        self.values = np.asarray(values, dtype=np.float64)
+        self.labels = labels
+
+    @classmethod
+    def from_points(cls, points: List[Any], labels: Tuple[str, ...] = ()) -> "Series":
+        if len(points) == 0:
+            return cls(np.empty(0), np.empty(0), labels)
+        ts, values = to_arrays(points)
+        order = np.argsort(ts, kind="stable")
+        ts, values = ts[order], values[order]
+        # the last point of a duplicated timestamp wins
+        keep = np.r_[ts[1:] != ts[:-1], True]
+        return cls(ts[keep], values[keep], labels)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def to_points(self) -> List[list]:
+        return [[int(t), None if math.isnan(v) else v] for t, v in zip(self.ts.tolist(), self.values.tolist())]
+
+    def dropna(self) -> "Series":
+        valid = ~np.isnan(self.values)
+        return Series(self.ts[valid], self.values[valid], self.labels)
+
+    def resample(self, step: float, start: Optional[float] = None, end: Optional[float] = None, how: str = "mean") -> "Series":
+        """
+        Resample to a grid of `step` ms from `start` (default: the first timestamp floored to the
+        step) to `end`. Each grid point takes the "mean", "max" or "last" value of the points in
+        [t, t + step), or the value linearly "interp"olated at t. Empty buckets are NaN.
+        """
+        series = self.dropna()
+        if len(series) == 0 and (start is None or end is None):
+            return Series(np.empty(0), np.empty(0), self.labels)
+        start = series.ts[0] // step * step if start is None else start
+        end = series.ts[-1] if end is None else end
+        grid = np.arange(start, end + 1, step, dtype=np.float64)
+        values = np.full(len(grid), np.nan)
+        if len(series) == 0 or len(grid) == 0:
+            return Series(grid, values, self.labels)
+        if how == "interp":
+            values = np.interp(grid, series.ts, series.values, left=np.nan, right=np.nan)
+            return Series(grid, values, self.labels)
+
+        index = ((series.ts - start) // step).astype(np.int64)
+        inside = (index >= 0) & (index < len(grid))
+        index, points = index[inside], series.values[inside]
+        if how == "max":
+            np.fmax.at(values, index, points)
+        elif how == "last":
+            last = np.r_[index[1:] != index[:-1], True]
+            values[index[last]] = points[last]
+        else:
+            counts = np.bincount(index, minlength=len(grid))
+            sums = np.bincount(index, weights=points, minlength=len(grid))
+            filled = counts > 0
+            values[filled] = sums[filled] / counts[filled]
+        return Series(grid, values, self.labels)
+
+    def increase(self) -> "Series":
+        """
+        Increase of a counter between consecutive points. A drop is a counter reset: the counter
+        restarted from zero, so the increase is the new value.
+        """
+        series = self.dropna()
+        delta = np.diff(series.values)
+        delta = np.where(delta < 0, series.values[1:], delta)
+        return Series(series.ts[1:], delta, self.labels)
+
+    def rate(self, per: float = 1000.0) -> "Series":
+        """
+        Per `per` ms (per second by default) rate of a counter, with counter resets handled.
+        """
+        series = self.dropna()
+        increase = series.increase()
+        return Series(increase.ts, increase.values / (np.diff(series.ts) / per), self.labels)
+
+    def derivative(self, per: float = 1000.0) -> "Series":
+        """
+        Per `per` ms change of a gauge, negative when it goes down.
+        """
+        series = self.dropna()
+        return Series(series.ts[1:], np.diff(series.values) / (np.diff(series.ts) / per), self.labels)
+
+
+def join(series: List[Series], step: float, how: str = "mean", inner: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resample several series to one grid of `step` ms. Returns the grid and a matrix with a row
+    per series. The grid spans the time range covered by all series when `inner`, else by any.
+    """
+    present = [s.dropna() for s in series]
+    present = [s for s in present if len(s) > 0]
+    if len(present) == 0:
+        return np.empty(0), np.empty((len(series), 0))
+    firsts, lasts = [s.ts[0] for s in present], [s.ts[-1] for s in present]
+    start, end = (max(firsts), min(lasts)) if inner else (min(firsts), max(lasts))
+    start = start // step * step
+    grid = np.arange(start, end + 1, step, dtype=np.float64)
+    matrix = np.vstack([s.resample(step, start, end, how).values for s in series]) if len(grid) > 0 else np.empty((len(series), 0))
+    return grid, matrix
+
+
+def lagged_correlations(x: np.ndarray, ys: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Pearson correlation of x with every row of ys at lags -max_lag..max_lag, column max_lag
+    being lag 0. At lag k, x[t] is paired with y[t - k]: a positive lag means y moves first.
+    Only pairs where both values are present count; too few pairs or no variance give NaN.
+    """
+    n = len(x)
+    result = np.full((len(ys), 2 * max_lag + 1), np.nan)
+    for column, lag in enumerate(range(-max_lag, max_lag + 1)):
+        if abs(lag) >= n - 2:
+            continue
+        xs = x[max(lag, 0) : n + min(lag, 0)]
+        yw = ys[:, max(-lag, 0) : n - max(lag, 0)]
+        valid = ~np.isnan(xs)[None, :] & ~np.isnan(yw)
+        count = valid.sum(axis=1)
+        xv, yv = np.where(valid, xs[None, :], 0.0), np.where(valid, yw, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean_x, mean_y = xv.sum(axis=1) / count, yv.sum(axis=1) / count
+            dx, dy = np.where(valid, xv - mean_x[:, None], 0.0), np.where(valid, yv - mean_y[:, None], 0.0)
+            r = (dx * dy).sum(axis=1) / np.sqrt((dx * dx).sum(axis=1) * (dy * dy).sum(axis=1))
+        result[:, column] = np.where((count >= 3) & np.isfinite(r), r, np.nan)
+    return result
+
+
+def transform_series(points: List[Any], transform: str = "none", step: Optional[float] = None) -> List[Any]:
+    """
+    Derive a series: the per second "rate" of a counter or "derivative" of a gauge, then
+    resampled to `step` ms when given.
+    """
+    series = Series.from_points(points)
+    if transform == "rate":
+        series = series.rate()
+    elif transform == "derivative":
+        series = series.derivative()
+    if step:
+        series = series.resample(step)
+    return series.to_points()
@@ -1,10 +1,13 @@
+import asyncio
 import secrets
 import time
-from typing import Any, List
+from typing import Any, Awaitable, Iterable, List, TypeVar
 from datetime import datetime
 from pydantic import BaseModel
 from mcp.types import TextContent
 
+T = TypeVar("T")
+
 
 def generate_name(prefix: str):
     token = secrets.token_hex(8)
@@ -58,3 +61,31 @@ def get_start_end_time(interval_in_mins: int):
     end_time = current_millis()
     start_time = end_time - interval_in_mins * 60 * 1000
     return start_time, end_time
+
+
+async def gather_with_concurrency(limit: int, coros: Iterable[Awaitable[T]]) -> List[T]:
+    semaphore = asyncio.Semaphore(limit)
+
+    async def bounded(coro: Awaitable[T]) -> T:
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*[bounded(coro) for coro in coros])
+
+
+def chunks(items: List[T], size: int) -> List[List[T]]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def to_table(rows: List[dict]) -> str:
+    if len(rows) == 0:
+        return "No data"
+    columns = list(dict.fromkeys(key for row in rows for key in row.keys()))
+    lines = [" | ".join(columns)]
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            cells.append(f"{value:.4g}" if isinstance(value, float) else f"{value}")
+        lines.append(" | ".join(cells))
+    return "\n".join(lines)